@@ -16,6 +16,7 @@ from selenium.webdriver.support import expected_conditions as EC
 import selenium.common # Used for error detection when switching windows within methods
 import datetime
 import os
+import time
 
 # from datetime import timedelta
 # from time import sleep
@@ -23,7 +24,8 @@ import os
 # import requests
 
 class WebdriverMain:
-    def __init__(self, suppress_all_msgs = False, suppress_confirmation = False, window_x = 800, window_y = 600):
+    # event_log (optional): event_log.EventLog that element lookups, clicks and typing are timed in
+    def __init__(self, suppress_all_msgs = False, suppress_confirmation = False, window_x = 800, window_y = 600, event_log = None):
         self.check_types_to_raise_exc(
             (window_x, window_y),
             ((int, float), (int, float)),
@@ -33,6 +35,13 @@ class WebdriverMain:
         self.window_size = (window_x, window_y) # Used to size window in new_driver()
         self.suppress_all_msgs = suppress_all_msgs
         self.suppress_confirmation = suppress_confirmation # If suppressed, does not ask user to press Enter after errors.
+        self.event_log = event_log
+        self.poll_interval = .05 # Seconds between checks of a wait's condition (see WAIT METHODS)
+
+        # Elements found with find_ele(cache = True), per window: {window_handle: {(search_by, search_for): element}} (see ELEMENT CACHE METHODS)
+        self.element_cache = {}
+        self.element_cache_hits = 0
+        self.element_cache_misses = 0
 
         # Error collection. Each error is a tuple with two elements: time stamp and the error itself (either a captured Exception or text passed to one of the error collecting methods).
         self.error_col = []
@@ -128,13 +137,15 @@ class WebdriverMain:
         # search_for: the string to search for
         # fail_msg: custom message to user upon a failure (see above comments)
         # wait_time: optional parameter. The amount of time in seconds to wait (for WebDriverWait). Default = 5.
+        # cache: optional parameter. If True, an element already found in this window with the same locator is returned without searching again. Default = False.
     # Success returns the found webdriver object. Failure returns False.
     def find_ele(self,
             window_handle,
             search_by,
             search_for,
             fail_msg,
-            wait_time = 5
+            wait_time = 5,
+            cache = False
     ):
         self.check_types_to_raise_exc(
             (window_handle, search_by, search_for, wait_time, fail_msg),
@@ -149,29 +160,44 @@ class WebdriverMain:
             if self.switch_window(self.driver.current_window_handle, window_handle) == False: return False
         # This exception occurs if a window has been closed and cannot be found. No need to log this error.
         except selenium.common.exceptions.NoSuchWindowException:
+            self.forget_window(window_handle)
             # Tries to switch to the first window in self.driver.window_handles list. If false, returns False.
             if self.no_window_err() == False: return False
 
-        # Sets up proper type object to use for search below based on search_by argument
-        match search_by:
-            case "id": search_by = By.ID
-            case "xpath": search_by = By.XPATH
-            case "link_text": search_by = By.LINK_TEXT
-            case "partial_link_text": search_by = By.PARTIAL_LINK_TEXT
-            case "tag_name": search_by = By.TAG_NAME
-            case "class_name": search_by = By.CLASS_NAME
-            case "css_selector": search_by = By.CSS_SELECTOR
-            case other: raise InvalidSearchForElement(search_by)
+        find_start = time.monotonic()
+        if cache:
+            cached_ele = self.element_cache.get(window_handle, {}).get((search_by, search_for))
+            if cached_ele != None:
+                self.element_cache_hits += 1
+                self.log_event("find element", find_start, "cached", fail_msg)
+                return cached_ele
+            self.element_cache_misses += 1
 
         try:
-            element = WebDriverWait(self.driver, wait_time).until(EC.presence_of_element_located((search_by, search_for)))
+            element = WebDriverWait(self.driver, wait_time).until(EC.presence_of_element_located((self.by_type(search_by), search_for)))
         except Exception as search_for_id_e:
+            self.log_event("find element", find_start, "failed", fail_msg)
             self.display_err_msg(
                 search_for_id_e,
                 f"\nFailed to find {fail_msg}"
             )
             return False
-        else: return element
+        else:
+            self.log_event("find element", find_start, "ok", fail_msg)
+            if cache: self.element_cache.setdefault(window_handle, {})[(search_by, search_for)] = element
+            return element
+
+    # Returns the By type object (selenium.webdriver.common.by) for a search_by argument ("id", "xpath", etc.)
+    def by_type(self, search_by):
+        match search_by:
+            case "id": return By.ID
+            case "xpath": return By.XPATH
+            case "link_text": return By.LINK_TEXT
+            case "partial_link_text": return By.PARTIAL_LINK_TEXT
+            case "tag_name": return By.TAG_NAME
+            case "class_name": return By.CLASS_NAME
+            case "css_selector": return By.CSS_SELECTOR
+            case other: raise InvalidSearchForElement(search_by)
 
     # Attempts to click an element.
     # Parameter webd_ele is a webdriver object. Ideally use self.find_ele() to obtain the webdriver object and then pass that in.
@@ -190,10 +216,13 @@ class WebdriverMain:
             # Tries to switch to the first window in self.driver.window_handles list. If false, returns False.
             if self.no_window_err() == False: return False
 
-        try: webd_ele.click()
+        click_start = time.monotonic()
+        try: self.act_on_ele(window_handle, webd_ele, fail_msg, lambda element: element.click())
         except Exception as click_e:
+            self.log_event("click", click_start, "failed", fail_msg)
             self.display_err_msg(click_e, f"\nFailed to click {fail_msg}\n\nPress Enter")
             return False
+        self.log_event("click", click_start, "ok", fail_msg)
 
     # Attempts to enter text into an element
     # Paremeter webd_ele is a webdriver element.
@@ -217,10 +246,13 @@ class WebdriverMain:
             # Tries to switch to the first window in self.driver.window_handles list. If false, returns False.
             if self.no_window_err() == False: return False
 
-        try: webd_ele.send_keys(text_to_enter)
+        enter_start = time.monotonic()
+        try: self.act_on_ele(window_handle, webd_ele, fail_msg, lambda element: element.send_keys(text_to_enter))
         except Exception as enter_text_e:
+            self.log_event("enter text", enter_start, "failed", fail_msg)
             self.display_err_msg(enter_text_e, f"Failed to enter text into {fail_msg}")
             return False
+        self.log_event("enter text", enter_start, "ok", fail_msg)
 
     # Attempts to press Enter on an element
     # Paremeter webd_ele is a webdriver element.
@@ -243,7 +275,7 @@ class WebdriverMain:
             # Tries to switch to the first window in self.driver.window_handles list. If false, returns False.
             if self.no_window_err() == False: return False
 
-        try: webd_ele.send_keys(Keys.ENTER)
+        try: self.act_on_ele(window_handle, webd_ele, fail_msg, lambda element: element.send_keys(Keys.ENTER))
         except Exception as press_enter_e:
             self.display_err_msg(press_enter_e, f"\nFailed to press enter on {fail_msg}")
             return False
@@ -254,14 +286,16 @@ class WebdriverMain:
        search_by,
        search_for,
        fail_msg,
-       wait_time = 5
+       wait_time = 5,
+       cache = False
     ):
         found_ele = self.find_ele(
             window_handle,
             search_by,
             search_for,
             fail_msg,
-            wait_time = wait_time
+            wait_time = wait_time,
+            cache = cache
         )
         if found_ele == False: return False # If not found, doesn't try to click.
         self.click_ele(window_handle, found_ele, fail_msg)
@@ -316,6 +350,88 @@ class WebdriverMain:
         ) == False: return
         self.press_enter_ele(window_handle, found_ele, fail_msg)
 
+    # ----------------------------ELEMENT CACHE METHODS----------------------------
+    # find_ele(cache = True) keeps found elements per window handle and locator, so fields that are used again in the same window
+    # (e.g., for every detail of a code) are only searched for once. element_cache_hits and element_cache_misses count cached lookups.
+    # Entries are dropped when their window closes (forget_window) or when an element has gone stale (the page re-rendered it).
+
+    # Runs action(element) on webd_ele. If webd_ele is a cached element that has gone stale, drops it from the cache,
+    # finds it again and runs action once more. Any other failure (or a stale element that was not cached) raises as usual.
+    def act_on_ele(self, window_handle, webd_ele, fail_msg, action):
+        try: return action(webd_ele)
+        except selenium.common.exceptions.StaleElementReferenceException:
+            locator = self.forget_element(window_handle, webd_ele)
+            if locator == None: raise
+            fresh_ele = self.find_ele(window_handle, locator[0], locator[1], fail_msg, cache = True)
+            if fresh_ele == False: raise
+        return action(fresh_ele)
+
+    # Drops webd_ele from window_handle's cached elements. Returns its locator (search_by, search_for), or None if it was not cached.
+    def forget_element(self, window_handle, webd_ele):
+        window_cache = self.element_cache.get(window_handle, {})
+        for locator, cached_ele in window_cache.items():
+            if cached_ele == webd_ele:
+                del window_cache[locator]
+                return locator
+        return None
+
+    # Drops all cached elements of a window (call when the window closes)
+    def forget_window(self, window_handle): self.element_cache.pop(window_handle, None)
+
+    # Drops the cached elements of every window that is no longer open (including windows the page closed itself, e.g., on save)
+    def prune_element_cache(self):
+        try: open_handles = set(self.driver.window_handles)
+        except selenium.common.exceptions.WebDriverException: return # Nothing is dropped if the windows can't be listed
+        for window_handle in [handle for handle in self.element_cache if handle not in open_handles]: self.forget_window(window_handle)
+
+    # ----------------------------WAIT METHODS----------------------------
+    # Waits on real conditions instead of fixed sleeps: each wait ends as soon as its condition is met, or after timeout seconds.
+    # Conditions are checked every poll_interval seconds (default self.poll_interval). WebDriver errors while checking (a window closing,
+    # a page reloading, an alert open, etc.) count as "not yet".
+    # Returns the condition's value (anything truthy) or False if the timeout passed first. Waits run in the driver's current window.
+    # fail_msg describes what is waited for (logged in self.event_log with the wait's time and outcome).
+
+    # Waits until condition(driver) returns something truthy
+    def wait_until(self, condition, timeout, fail_msg, poll_interval = None):
+        if poll_interval == None: poll_interval = self.poll_interval
+        wait_start = time.monotonic()
+        try:
+            result = WebDriverWait(
+                self.driver,
+                timeout,
+                poll_frequency = poll_interval,
+                ignored_exceptions = (selenium.common.exceptions.WebDriverException,)
+            ).until(condition)
+        except selenium.common.exceptions.TimeoutException:
+            self.log_event("wait", wait_start, "timeout", fail_msg)
+            return False
+        self.log_event("wait", wait_start, "ok", fail_msg)
+        return result
+
+    # Waits until at least count windows/tabs are open. Returns the number open.
+    def wait_for_window_count(self, count, timeout, fail_msg = "window count"):
+        return self.wait_until(lambda driver: len(driver.window_handles) >= count and len(driver.window_handles), timeout, fail_msg)
+
+    # Waits until an element is present (or clickable, if clickable is True) and returns it
+    def wait_for_element(self, search_by, search_for, timeout, fail_msg, clickable = False):
+        if clickable: condition = EC.element_to_be_clickable((self.by_type(search_by), search_for))
+        else: condition = EC.presence_of_element_located((self.by_type(search_by), search_for))
+        return self.wait_until(condition, timeout, fail_msg)
+
+    # Waits until an element's value is filled in (e.g., a field PCC fills in) and returns the value
+    # The element is found again on every check, so the wait still works if the page re-renders it while filling it in.
+    def wait_for_value(self, search_by, search_for, timeout, fail_msg):
+        search_by = self.by_type(search_by)
+        return self.wait_until(lambda driver: driver.find_element(search_by, search_for).get_attribute("value"), timeout, fail_msg)
+
+    # Waits until an alert is open and returns it
+    def wait_for_alert(self, timeout, fail_msg = "alert"):
+        return self.wait_until(EC.alert_is_present(), timeout, fail_msg)
+
+    # Waits until the current page has finished loading
+    def wait_for_document_ready(self, timeout, fail_msg = "page load"):
+        return self.wait_until(lambda driver: driver.execute_script("return document.readyState") == "complete", timeout, fail_msg)
+
     # ----------------------------MISC METHODS----------------------------
     # Easy way to clear the console anytime.
     def clear_console(self): os.system("cls")
@@ -337,6 +453,10 @@ class WebdriverMain:
 
         self.error_col.append((datetime.datetime.now(), error))
 
+    # Logs a step in self.event_log (if there is one). element is the fail_msg description of the element (e.g., "New Diagnosis button").
+    def log_event(self, step, start, outcome, element):
+        if self.event_log != None: self.event_log.emit(step, start, outcome, element = element)
+
     # Called if first attempt to switch windows fails. This attempts to switch to the first window in self.driver.window_handles. If this fails, there should be no windows open (requiring a new webdriver).
     def no_window_err(self):
         try:
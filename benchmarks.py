@@ -0,0 +1,517 @@
+# CodeM UP benchmarks
+# Run from the CodeM UP directory: python benchmarks.py <benchmark name>
+# Run without a name to list the available benchmarks.
+
+import sys
+
+# Worker processes (parallel PDF extraction) re-import this script as "__mp_main__" on Windows. Benchmarks only run in the main process.
+if __name__ not in ("__main__", "__mp_main__"):
+    print("This is a stand-alone benchmark script. Do not import.")
+    sys.exit()
+
+import random
+import re
+import time
+
+# Builds a fake packet of page text with a realistic mix of valid codes, dotted codes and junk that matches the ICD-10 regex
+# (page IDs, lab accession numbers, etc.). Seeded so every run scans the same text.
+def build_fake_packet(num_pages: int, candidates_per_page: int = 40):
+    from full_codes import codes_list
+
+    rand = random.Random(2022)
+    pages = []
+    for page in range(num_pages):
+        words = []
+        for i in range(candidates_per_page):
+            pick = rand.random()
+            code = rand.choice(codes_list)
+            if pick < .4: words.append(code) # Undotted valid code
+            elif pick < .7: words.append(code[:3] + "." + code[3:]) # Dotted valid code
+            else: words.append(rand.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") + str(rand.randint(10000, 999999))) # Junk
+            words.append("lorem ipsum dolor sit amet")
+        pages.append(f"Page {page + 1} of {num_pages}\n" + " ".join(words))
+    return pages
+
+# Current resident set size (RSS) of this process in bytes
+def current_rss():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError: pass
+
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+        return counters.WorkingSetSize
+
+    import os
+    with open("/proc/self/statm") as statm: return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+# Times func once and returns seconds
+def time_it(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+# Returns the value of a setting in CM_Settings.csv (None if it is not there)
+def read_setting(name: str):
+    with open("CM_Settings.csv", "r", newline = "") as cm_settings:
+        for row in cm_settings.read().splitlines():
+            if row.split(",", 1)[0] == name: return row.split(",", 1)[1]
+
+# Sets a setting in CM_Settings.csv (added at the end if it is not there). Other rows, line endings and the final line ending are kept as they are.
+def save_setting(name: str, value: str):
+    with open("CM_Settings.csv", "r", newline = "") as cm_settings: settings_text = cm_settings.read()
+    line_ending = "\n" if "\r\n" not in settings_text and "\n" in settings_text else "\r\n"
+    rows = settings_text.splitlines()
+    new_row = f"{name},{value}"
+    names = [row.split(",", 1)[0] for row in rows]
+    if name in names: rows[names.index(name)] = new_row
+    else: rows.append(new_row)
+    final_line_ending = line_ending if settings_text.endswith(("\r\n", "\n")) else ""
+    with open("CM_Settings.csv", "w", newline = "") as cm_settings: cm_settings.write(line_ending.join(rows) + final_line_ending)
+
+# ------------------ Benchmarks ------------------
+# Linear tuple scan (original PdfProcessing code) vs. hashed CodeIndex on a 500-page packet
+def bench_code_index():
+    from full_codes import codes_list
+    from code_index import get_code_index
+
+    pages = build_fake_packet(500)
+    page_results = [re.findall(r"[A-Z]\d{2}\.?\w{0,4}", page_text) for page_text in pages]
+    num_candidates = sum(len(results) for results in page_results)
+
+    def tuple_scan():
+        regex_results = []
+        for results in page_results:
+            for code in results:
+                if code not in regex_results:
+                    if code.replace(".", "") in codes_list: regex_results.append(code)
+        return regex_results
+
+    def index_scan():
+        code_index = get_code_index()
+        regex_results = []
+        for results in page_results:
+            for code in code_index.validate_many(results):
+                if code not in regex_results: regex_results.append(code)
+        return regex_results
+
+    build_time = time_it(get_code_index)
+    if tuple_scan() != index_scan(): print("WARNING: results differ between the tuple scan and the index")
+
+    print(f"500 pages, {num_candidates} regex candidates")
+    print(f"CodeIndex build (once per session): {build_time * 1000:.1f} ms")
+    print(f"Tuple scan:  {time_it(tuple_scan):.3f} s")
+    print(f"Code index:  {time_it(index_scan):.3f} s")
+
+# Original apply_regex (uncompiled findall per page, list dedupe) vs. CodeExtractor per page and single scan
+def bench_extraction():
+    from code_index import get_code_index
+    from code_extractor import CodeExtractor
+
+    pages = build_fake_packet(500)
+    code_index = get_code_index()
+
+    def list_dedupe():
+        regex_results = []
+        for page_text in pages:
+            for code in code_index.validate_many(re.findall(r"[A-Z]\d{2}\.?\w{0,4}", page_text)):
+                if code not in regex_results: regex_results.append(code)
+        return regex_results
+
+    def extractor(single_scan):
+        code_extractor = CodeExtractor(code_index)
+        code_extractor.scan_pages(pages, single_scan = single_scan)
+        return code_extractor
+
+    per_page, single = extractor(False), extractor(True)
+    if per_page.codes != list_dedupe() or single.codes != per_page.codes or single.page_hits != per_page.page_hits:
+        print("WARNING: results differ between extraction methods")
+
+    print(f"500 pages, {len(per_page.codes)} distinct codes, {sum(per_page.page_hits)} valid hits")
+    print(f"List dedupe:             {time_it(list_dedupe):.3f} s")
+    print(f"CodeExtractor per page:  {time_it(extractor, False):.3f} s")
+    print(f"CodeExtractor one scan:  {time_it(extractor, True):.3f} s")
+
+# Scanning a packet that is half repeated pages and boilerplate lines with CodeExtractor's skip_repeats "off", "pages" and "lines"
+# Usage: python benchmarks.py repeats
+def bench_repeats():
+    from code_index import get_code_index
+    from code_extractor import CodeExtractor
+
+    unique_pages = build_fake_packet(250)
+    rand = random.Random(2022)
+    boilerplate = "\n".join(unique_pages[0].split(" lorem ipsum dolor sit amet ")[:10]) # Header/footer block with a few codes in it
+    pages = []
+    for page_text in unique_pages:
+        pages.append(f"{boilerplate}\n{page_text}\n{boilerplate}")
+        pages.append(f"{boilerplate}\n{rand.choice(unique_pages)}\n{boilerplate}") # Repeat of some page (problem list printed again, etc.)
+    code_index = get_code_index()
+
+    def extractor(skip_repeats):
+        code_extractor = CodeExtractor(code_index, skip_repeats)
+        for page_text in pages: code_extractor.scan_page(page_text)
+        return code_extractor
+
+    results = {skip_repeats: extractor(skip_repeats) for skip_repeats in CodeExtractor.skip_repeats_options}
+    if any(result.codes != results["off"].codes or result.page_hits != results["off"].page_hits for result in results.values()):
+        print("WARNING: results differ between skip_repeats options")
+
+    total_bytes = sum(len(page_text.encode("utf-8")) for page_text in pages)
+    print(f"{len(pages)} pages, {total_bytes / 1024:.0f} KB of text, {len(results['off'].codes)} distinct codes")
+    for skip_repeats, result in results.items():
+        print(f"skip_repeats = {skip_repeats:6} {time_it(extractor, skip_repeats):.3f} s, {result.skipped_bytes / 1024:.0f} KB skipped")
+
+# Peak Python memory and time to first code: the original import (all pages' text read and kept, then scanned) vs. stream_pdf()
+# (one page at a time). import_pdf() is now a wrapper around stream_pdf(), so the original loop is copied here.
+# Usage: python benchmarks.py streaming <path to a large PDF>
+def bench_streaming(pdf_path: str):
+    import tracemalloc
+    from PyPDF2 import PdfReader
+    from code_index import get_code_index
+    from code_extractor import CodeExtractor
+    from pdf_processing import PdfProcessing
+
+    # Original PdfProcessing.import_pdf() and apply_regex(): extracts every page's text into a list, then scans the list
+    def old_import(pdf_path):
+        pdf_reader = PdfReader(pdf_path)
+        pdf_all_text = []
+        for page in range(0, len(pdf_reader.pages)): pdf_all_text.append(pdf_reader.pages[page].extract_text())
+        code_extractor = CodeExtractor(get_code_index())
+        return sorted(code_extractor.scan_pages(pdf_all_text))
+
+    # Returns seconds until the first code was found
+    def stream(pdf_path):
+        start = time.perf_counter()
+        first_code_time = None
+        for page_scan in pdf_processor.stream_pdf(pdf_path):
+            if first_code_time == None and page_scan.new_codes != []: first_code_time = time.perf_counter() - start
+        return first_code_time
+
+    pdf_processor = PdfProcessing()
+    codes = old_import(pdf_path) # Also loads the code index and warms up PyPDF2 before timing
+    first_code_time = stream(pdf_path)
+    if sorted(pdf_processor.regex_results) != codes: print("WARNING: results differ between the original import and stream_pdf")
+
+    # Times are measured without tracemalloc (it slows Python down many times over). Peak memory is measured in a separate run.
+    import_time = min(time_it(old_import, pdf_path) for run in range(3))
+    stream_time = min(time_it(stream, pdf_path) for run in range(3))
+    peaks = []
+    for func in (old_import, stream):
+        tracemalloc.start()
+        func(pdf_path)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    print(f"{len(pdf_processor.page_hits)} pages, {len(codes)} codes")
+    # The original import has no codes until every page has been read and scanned
+    print(f"Original (read all, then scan): {import_time:.3f} s, peak {peaks[0] / 1024 ** 2:.1f} MB, first code after {import_time:.3f} s")
+    print(f"stream_pdf:                     {stream_time:.3f} s, peak {peaks[1] / 1024 ** 2:.1f} MB, first code after {first_code_time:.3f} s")
+
+# Serial vs. process pool text extraction
+# Usage: python benchmarks.py parallel <path to a large PDF> [number of workers (default: one per CPU core)]
+def bench_parallel(pdf_path: str, pdf_workers: str = "0"):
+    from pdf_processing import PdfProcessing
+
+    def stream(pdf_processor):
+        for page_scan in pdf_processor.stream_pdf(pdf_path): pass
+        return pdf_processor
+
+    serial = PdfProcessing(1)
+    parallel = PdfProcessing(int(pdf_workers))
+    serial_time = time_it(stream, serial)
+    parallel_time = time_it(stream, parallel)
+
+    if parallel.parallel_error != None: print(f"WARNING: parallel extraction failed and fell back to serial: {parallel.parallel_error}")
+    if serial.regex_results != parallel.regex_results: print("WARNING: results differ between serial and parallel extraction")
+
+    print(f"{len(serial.page_hits)} pages, {len(serial.regex_results)} codes, {parallel.num_workers()} workers")
+    print(f"Serial:   {serial_time:.2f} s")
+    print(f"Parallel: {parallel_time:.2f} s")
+
+# One file after another vs. one batch import of all files
+# Usage: python benchmarks.py batch <PDF 1> <PDF 2> ...
+def bench_batch(*pdf_paths):
+    from pdf_processing import PdfProcessing
+
+    pdf_processor = PdfProcessing(0)
+
+    def one_by_one():
+        for pdf_path in pdf_paths:
+            for page_scan in pdf_processor.stream_pdf(pdf_path): pass
+
+    def batch():
+        for pdf_path, page_scan in pdf_processor.stream_batch(list(pdf_paths)): pass
+
+    file_times = [time_it(lambda: [page_scan for page_scan in pdf_processor.stream_pdf(pdf_path)]) for pdf_path in pdf_paths]
+    print(f"{len(pdf_paths)} files, {pdf_processor.num_workers()} workers")
+    print(f"Largest file alone: {max(file_times):.2f} s")
+    print(f"One by one:         {time_it(one_by_one):.2f} s")
+    print(f"Batch:              {time_it(batch):.2f} s ({len(pdf_processor.code_sources)} codes)")
+
+# Times every installed PDF backend (see pdf_processing.pdf_backends) on sample PDFs and saves the fastest one to the pdf_backend setting
+# A backend only counts if it finds exactly the same codes in every file as the backend currently in the settings.
+# Usage: python benchmarks.py backends <PDF 1> <PDF 2> ...
+def bench_backends(*pdf_paths):
+    from pdf_processing import pdf_backends, installed_backends
+    from code_index import get_code_index
+    from code_extractor import CodeExtractor
+
+    code_index = get_code_index()
+
+    # Returns seconds to extract and scan every file, and the set of codes found in each file
+    def extract(backend_name):
+        file_codes = []
+        start = time.perf_counter()
+        for pdf_path in pdf_paths:
+            pdf_reader = pdf_backends[backend_name](pdf_path)
+            code_extractor = CodeExtractor(code_index)
+            for page_text in pdf_reader.iter_text(0, pdf_reader.num_pages): code_extractor.scan_page(page_text)
+            file_codes.append({code_index.normalize(code) for code in code_extractor.codes})
+        return time.perf_counter() - start, file_codes
+
+    if pdf_paths == ():
+        print("Usage: python benchmarks.py backends <PDF 1> <PDF 2> ...")
+        return
+    current_backend = read_setting("pdf_backend") or "PyPDF2"
+    backend_names = installed_backends()
+    if current_backend not in backend_names:
+        print(f"The current backend ({current_backend}) is not installed, so results cannot be checked against it.")
+        return
+
+    try: reference_codes = extract(current_backend)[1]
+    except Exception as backend_e:
+        print(f"The current backend ({current_backend}) failed, so results cannot be checked against it: {backend_e!r}")
+        return
+    results = {}
+    for backend_name in backend_names:
+        try: seconds, file_codes = extract(backend_name)
+        except Exception as backend_e:
+            print(f"{backend_name:10} failed: {backend_e!r}")
+            continue
+        correct = file_codes == reference_codes
+        print(f"{backend_name:10} {seconds:.2f} s, {sum(len(codes) for codes in file_codes)} codes" + ("" if correct else " (DIFFERENT CODES)"))
+        if correct: results[backend_name] = seconds
+
+    if results == {}:
+        print("No backend extracted the same codes as the current one. pdf_backend was not changed.")
+        return
+    fastest = min(results, key = results.get)
+    save_setting("pdf_backend", fastest)
+    print(f"Saved pdf_backend = {fastest}")
+
+# Saving imported codes to Excel: the old way (delete, copy template, load, write cell by cell, save) vs. DataframeHandler's in-memory
+# template with a bulk write and atomic save. Writes to a temporary folder.
+# Usage: python benchmarks.py excel_writer
+def bench_excel_writer():
+    import os, shutil, tempfile
+    import openpyxl as op
+    from full_codes import codes_list
+    from pandas_handler import DataframeHandler
+
+    temp_dir = tempfile.mkdtemp()
+    excel_file_path = os.path.join(temp_dir, "CM_Codes.xlsx")
+    dataframe_handler = DataframeHandler(excel_file_path, "Codes Import", 2, "CM_TEMPLATE_CM_Codes.xlsx", os.path.join(temp_dir, "log.csv"))
+
+    def old_save(codes):
+        if os.path.isfile(excel_file_path): os.remove(excel_file_path)
+        shutil.copy("CM_TEMPLATE_CM_Codes.xlsx", excel_file_path)
+        wb = op.load_workbook(excel_file_path)
+        ws = wb["Codes Import"]
+        for i, code in enumerate(codes): ws["A" + str(i + 2)].value = code
+        wb.save(excel_file_path)
+
+    def new_save(codes):
+        dataframe_handler.create_df(codes)
+        if dataframe_handler.save_codes_to_excel() != None: print("WARNING: save failed")
+
+    new_save(codes_list[:1]) # The template is parsed once per session, so it isn't part of the per-save time
+    print("Codes   Old save   New save")
+    for num_codes in (10, 100, 1000):
+        codes = list(codes_list[:num_codes])
+        old_seconds = min(time_it(old_save, codes) for run in range(3))
+        new_seconds = min(time_it(new_save, codes) for run in range(3))
+        print(f"{num_codes:5}   {old_seconds:.3f} s    {new_seconds:.3f} s")
+    shutil.rmtree(temp_dir)
+
+# Saving imported codes and reading them back for an upload: the Excel file vs. the SQLite working store (working_store setting)
+def bench_working_store():
+    import os, shutil, tempfile
+    from full_codes import codes_list
+    from pandas_handler import DataframeHandler
+
+    temp_dir = tempfile.mkdtemp()
+    excel_file_path = os.path.join(temp_dir, "CM_Codes.xlsx")
+    print("Codes   Store    Save       Read")
+    for working_store in ("excel", "sqlite"):
+        dataframe_handler = DataframeHandler(
+            excel_file_path, "Codes Import", 2, "CM_TEMPLATE_CM_Codes.xlsx", os.path.join(temp_dir, "log.csv"), working_store
+        )
+        dataframe_handler.create_df(list(codes_list[:1]))
+        dataframe_handler.save_codes() # The template is parsed once per session
+        for num_codes in (10, 100, 1000):
+            dataframe_handler.create_df(list(codes_list[:num_codes]))
+            save_seconds = min(time_it(dataframe_handler.save_codes) for run in range(3))
+            read_seconds = []
+            for run in range(3):
+                dataframe_handler.read_cache_key = None # Every read parses the Excel file
+                read_seconds.append(time_it(dataframe_handler.read_codes))
+            print(f"{num_codes:5}   {working_store:6}   {save_seconds:.4f} s   {min(read_seconds):.4f} s")
+        if dataframe_handler.store != None: dataframe_handler.store.close()
+    shutil.rmtree(temp_dir)
+
+# Reading every field of the codes table the way the upload loop does: DataFrame .loc per cell vs. CodeRow records (converted once)
+def bench_code_rows(num_rows: str = "1000"):
+    import pandas as pd
+    from full_codes import codes_list
+    from code_rows import code_rows_from_df
+
+    headers = ["ICD-10 Code", "Resolved Date", "Rank", "Classification", "Comments", "Confidential?", "Source (not entered into PCC)"]
+    rows = [[code, "", "", "", "Per H&P ", "", "a.pdf p.1"] for code in codes_list[:int(num_rows)]]
+    df_codes = pd.DataFrame(rows, columns = headers, dtype = object)
+
+    def loc_read():
+        for i in range(0, len(df_codes.index)):
+            for col in df_codes.columns.values: df_codes.loc[i, col].strip()
+
+    def record_read():
+        for code_row in code_rows_from_df(df_codes): code_row.filled_fields()
+
+    loc_seconds = min(time_it(loc_read) for run in range(3))
+    record_seconds = min(time_it(record_read) for run in range(3))
+    print(f"{num_rows} rows: .loc {loc_seconds:.4f} s, CodeRow records {record_seconds:.4f} s (including conversion)")
+
+# Logging a burst of errors (as a bad PCC session does): read_csv/concat/to_csv per error vs. the buffered append-only logger
+def bench_error_log(num_errors: str = "1000"):
+    import os, shutil, tempfile, datetime
+    from pandas import read_csv, concat, DataFrame
+    from error_logger import ErrorLogger
+
+    temp_dir = tempfile.mkdtemp()
+    old_log_path = os.path.join(temp_dir, "old_log.csv")
+
+    def old_log_error(notes, exception):
+        df_new_err = DataFrame.from_dict({
+            "datetime": [datetime.datetime.now().strftime("%Y-%m-%d %H:%M")], "notes": [notes], "exception": [exception]
+        })
+        if os.path.exists(old_log_path): df_new_err = concat([read_csv(old_log_path, index_col = 0), df_new_err])
+        df_new_err.to_csv(old_log_path)
+
+    error_logger = ErrorLogger(os.path.join(temp_dir, "new_log.csv"))
+    for name, log_error in (("read_csv/to_csv", old_log_error), ("buffered", error_logger.log_error)):
+        start = time.perf_counter()
+        for i in range(int(num_errors)): log_error(f"Attempted to enter code {i}", ValueError("Element not found"))
+        caller_seconds = time.perf_counter() - start
+        error_logger.writer.flush()
+        print(f"{name:16} {caller_seconds * 1000:9.1f} ms in the caller, {(time.perf_counter() - start) * 1000:9.1f} ms until written")
+    shutil.rmtree(temp_dir)
+
+# Startup cost of the code set: import full_codes (tuple literal) vs. the memory-mapped binary table (full_codes.bin)
+# Each is loaded in a fresh Python process. Run build_code_table.py first.
+def bench_startup(runs: str = "5"):
+    import subprocess, json, inspect
+
+    loaders = {
+        "import full_codes": "import full_codes; codes = full_codes.codes_list",
+        "CodeTable (mmap)": "from code_table import CodeTable; from code_index import code_table_path; codes = CodeTable(code_table_path)",
+        "CodeIndex (full_codes)": "from code_index import CodeIndex; from full_codes import codes_list; codes = CodeIndex(codes_list, '')",
+        "CodeIndex (mmap)": "from code_index import get_code_index; codes = get_code_index()"
+    }
+    # Measures inside the child process so interpreter start-up is not counted
+    child = (
+        "import sys, time, json\n"
+        + inspect.getsource(current_rss) +
+        "rss_before = current_rss()\n"
+        "start = time.perf_counter()\n"
+        "{loader}\n"
+        "'E119' in codes\n"
+        "print(json.dumps([time.perf_counter() - start, current_rss() - rss_before]))\n"
+    )
+
+    for name, loader in loaders.items():
+        results = []
+        for run in range(int(runs)):
+            output = subprocess.run(
+                [sys.executable, "-c", child.replace("{loader}", loader)], capture_output = True, text = True, check = True
+            ).stdout
+            results.append(json.loads(output))
+        load_time = min(result[0] for result in results)
+        rss = min(result[1] for result in results)
+        print(f"{name:24} {load_time * 1000:8.1f} ms  {rss / 1024 ** 2:6.1f} MB RSS")
+
+# Resident memory and time of validating a packet's candidates: frozenset CodeIndex (full_codes.py) vs. the memory-mapped table
+# Each runs in a fresh Python process and counts loading the code set plus everything membership builds on first use.
+def bench_code_memory(runs: str = "3"):
+    import subprocess, json, inspect, tempfile, os
+
+    candidates = [code for page_text in build_fake_packet(1000) for code in re.findall(r"[A-Z]\d{2}\.?\w{0,4}", page_text)]
+    with tempfile.NamedTemporaryFile("w", suffix = ".json", delete = False) as candidates_file: json.dump(candidates, candidates_file)
+
+    loaders = {
+        "CodeIndex (full_codes)": "from code_index import CodeIndex; from full_codes import codes_list; code_index = CodeIndex(codes_list, '')",
+        "CodeIndex (mmap)": "from code_index import load_code_index; code_index = load_code_index()"
+    }
+    # Candidates are read before the first RSS reading so they are not counted
+    child = (
+        "import sys, time, json\n"
+        + inspect.getsource(current_rss) +
+        f"candidates = json.load(open({candidates_file.name!r}))\n"
+        "rss_before = current_rss()\n"
+        "start = time.perf_counter()\n"
+        "{loader}\n"
+        "load_time = time.perf_counter() - start\n"
+        "valid_codes = code_index.validate_many(candidates)\n"
+        "print(json.dumps([load_time, time.perf_counter() - start - load_time, current_rss() - rss_before, len(valid_codes)]))\n"
+    )
+
+    try:
+        print(f"{len(candidates)} regex candidates")
+        for name, loader in loaders.items():
+            results = []
+            for run in range(int(runs)):
+                output = subprocess.run(
+                    [sys.executable, "-c", child.replace("{loader}", loader)], capture_output = True, text = True, check = True
+                ).stdout
+                results.append(json.loads(output))
+            load_time = min(result[0] for result in results)
+            validate_time = min(result[1] for result in results)
+            rss = min(result[2] for result in results)
+            print(f"{name:24} load {load_time * 1000:6.1f} ms  validate {validate_time * 1000:6.1f} ms  {rss / 1024 ** 2:6.1f} MB RSS  ({results[0][3]} valid)")
+    finally: os.remove(candidates_file.name)
+
+benchmarks = {
+    "code_index": bench_code_index,
+    "extraction": bench_extraction,
+    "streaming": bench_streaming,
+    "parallel": bench_parallel,
+    "batch": bench_batch,
+    "startup": bench_startup,
+    "code_memory": bench_code_memory,
+    "repeats": bench_repeats,
+    "backends": bench_backends,
+    "excel_writer": bench_excel_writer,
+    "working_store": bench_working_store,
+    "code_rows": bench_code_rows,
+    "error_log": bench_error_log
+}
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in benchmarks:
+        print("Available benchmarks: " + ", ".join(benchmarks))
+        sys.exit()
+
+    benchmarks[sys.argv[1]](*sys.argv[2:])
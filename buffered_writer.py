@@ -0,0 +1,102 @@
+import sys
+
+if __name__ == "__main__":
+    print("This is not the main module. Do not execute directly.")
+    sys.exit()
+
+import os, threading, queue, atexit, time
+
+# Append-only text file written by a background thread
+# write() only puts the text on a queue, so callers (the Tk thread, the PCC upload loop) never wait for the disk. The thread takes everything
+# that is waiting, appends it in one write and goes back to waiting, so a burst of lines costs one file open and one write.
+# When the file grows past max_bytes it is renamed to <name>.old<ext> (replacing the previous one) and a new file is started with the header.
+# If the file can't be written (e.g., it is open in Excel), the lines stay buffered and are retried every retry_seconds. Nothing is shown to
+# the user from the thread; the last error is kept in last_error.
+# Use get_buffered_writer() so every logger of a file shares one writer (and one thread).
+class BufferedWriter:
+    retry_seconds = 1
+
+    def __init__(self, file_path: str, header: str = "", max_bytes: int = 256 * 1024):
+        self.file_path = file_path
+        self.header = header # Written at the start of a new file
+        self.max_bytes = max_bytes # 0 = never rotated
+        self.queue = queue.Queue()
+        self.pending = [] # Lines taken off the queue but not written yet (the file could not be written)
+        self.last_error = None
+        self.thread = threading.Thread(target = self.run, name = f"BufferedWriter {os.path.basename(file_path)}", daemon = True)
+        self.thread.start()
+
+    # Adds text to the end of the file (soon). Never blocks.
+    def write(self, text: str): self.queue.put(text)
+
+    # Waits until everything written so far is in the file, or timeout seconds (None = no limit). Returns True if everything was written.
+    def flush(self, timeout: float = None):
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    # Starts a new file now (the current one becomes <name>.old<ext>) if it is larger than max_bytes
+    def rotate(self):
+        self.queue.put(self.rotate_if_full)
+        return self.flush(5)
+
+    def run(self):
+        while True:
+            items = [self.queue.get()]
+            while True: # Takes everything else that is already waiting
+                try: items.append(self.queue.get_nowait())
+                except queue.Empty: break
+
+            events = []
+            for item in items:
+                if isinstance(item, threading.Event): events.append(item)
+                elif callable(item): item()
+                else: self.pending.append(item)
+
+            while self.pending != [] and not self.append_pending():
+                time.sleep(self.retry_seconds)
+                try: # New lines and flush requests keep arriving while the file can't be written
+                    while True:
+                        item = self.queue.get_nowait()
+                        if isinstance(item, threading.Event): events.append(item)
+                        elif callable(item): item()
+                        else: self.pending.append(item)
+                except queue.Empty: pass
+            for event in events: event.set()
+
+    # Appends the pending lines in one write. Returns False if the file could not be written (the lines stay pending).
+    def append_pending(self):
+        try:
+            self.rotate_if_full()
+            with open(self.file_path, "a", encoding = "utf-8", newline = "") as out_file:
+                if out_file.tell() == 0: out_file.write(self.header)
+                out_file.write("".join(self.pending))
+        except OSError as append_e:
+            self.last_error = append_e
+            return False
+        self.pending = []
+        return True
+
+    def rotate_if_full(self):
+        if self.max_bytes == 0: return
+        try:
+            if os.path.getsize(self.file_path) < self.max_bytes: return
+            root, extension = os.path.splitext(self.file_path)
+            os.replace(self.file_path, f"{root}.old{extension}")
+        except OSError as rotate_e:
+            if os.path.exists(self.file_path): self.last_error = rotate_e
+
+_writers = {} # {absolute file path: BufferedWriter}
+_writers_lock = threading.Lock()
+
+# Returns the shared BufferedWriter of a file, starting it the first time
+def get_buffered_writer(file_path: str, header: str = "", max_bytes: int = 256 * 1024):
+    key = os.path.abspath(file_path)
+    with _writers_lock:
+        if key not in _writers: _writers[key] = BufferedWriter(file_path, header, max_bytes)
+        return _writers[key]
+
+# Gives every writer a moment to finish when Python exits (their threads are daemon threads, so they would otherwise be cut off)
+@atexit.register
+def flush_all_writers():
+    for writer in list(_writers.values()): writer.flush(2)
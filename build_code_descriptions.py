@@ -0,0 +1,27 @@
+# Builds full_codes_descriptions.txt.gz (local code description store, see code_descriptions.py) from CMS code files
+# Download the "Code Descriptions in Tabular Order" zip for each fiscal year from https://www.cms.gov/medicare/icd-10 and pass the
+# icd10cm_codes_YYYY.txt files, oldest first. Codes missing from the newest file are marked as retired.
+# Run from the CodeM UP directory: python build_code_descriptions.py icd10cm_codes_2022.txt icd10cm_codes_2023.txt
+
+import sys
+
+if __name__ != "__main__":
+    print("This is a stand-alone build script. Do not import.")
+    sys.exit()
+
+from code_descriptions import build_code_descriptions, descriptions_path, CodeDescriptions
+
+if len(sys.argv) < 2:
+    print("Usage: python build_code_descriptions.py <icd10cm_codes file> [<newer icd10cm_codes file> ...]")
+    sys.exit(1)
+
+num_codes = build_code_descriptions(sys.argv[1:], descriptions_path)
+
+# Checks that the store reads back
+code_descriptions = CodeDescriptions(descriptions_path)
+code_descriptions.load()
+if len(code_descriptions._descriptions) != num_codes:
+    print("Description store does not match the CMS files")
+    sys.exit(1)
+num_retired = sum(1 for description, retired in code_descriptions._descriptions.values() if retired)
+print(f"Wrote {num_codes} codes ({num_retired} retired) to {descriptions_path}")
@@ -0,0 +1,36 @@
+# Adds a CMS release to code_set_deltas.json (versioned code sets, see code_sets.py) as its changes from the newest release already there
+# Download the "Code Descriptions in Tabular Order" zip for the fiscal year from https://www.cms.gov/medicare/icd-10 and pass its
+# icd10cm_codes_YYYY.txt file. Releases must be added in order. The newest release can be rebuilt by adding it again.
+# Run from the CodeM UP directory: python build_code_set_delta.py 2023 icd10cm_codes_2023.txt
+
+import sys
+
+if __name__ != "__main__":
+    print("This is a stand-alone build script. Do not import.")
+    sys.exit()
+
+import json
+from code_index import get_code_index, get_code_set_deltas, base_code_set_version
+from code_sets import deltas_path
+from code_descriptions import read_cms_codes
+
+if len(sys.argv) != 3:
+    print("Usage: python build_code_set_delta.py <fiscal year> <icd10cm_codes file>")
+    sys.exit(1)
+version, cms_code_file = sys.argv[1], sys.argv[2]
+
+code_set_deltas = get_code_set_deltas()
+previous_versions = [existing_version for existing_version in code_set_deltas.versions if existing_version < version]
+if version <= base_code_set_version or code_set_deltas.versions[-1] > version:
+    print(f"Only releases newer than {code_set_deltas.versions[-1]} can be added (or the newest release rebuilt).")
+    sys.exit(1)
+
+previous_codes = set(get_code_index(previous_versions[-1]).codes)
+new_codes = set(read_cms_codes(cms_code_file))
+deltas = dict(code_set_deltas.deltas)
+deltas[version] = {"add": sorted(new_codes - previous_codes), "delete": sorted(previous_codes - new_codes)}
+
+with open(deltas_path, "w", encoding = "utf-8") as deltas_file:
+    json.dump({"base": base_code_set_version, "deltas": dict(sorted(deltas.items()))}, deltas_file)
+
+print(f"Code set {version}: {len(deltas[version]['add'])} codes added and {len(deltas[version]['delete'])} deleted since {previous_versions[-1]}")
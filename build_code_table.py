@@ -0,0 +1,22 @@
+# Builds full_codes.bin (compact binary code table, see code_table.py) from full_codes.py
+# Run from the CodeM UP directory whenever full_codes.py changes: python build_code_table.py
+
+import sys
+
+if __name__ != "__main__":
+    print("This is a stand-alone build script. Do not import.")
+    sys.exit()
+
+from full_codes import codes_list
+from code_table import build_code_table, CodeTable
+from code_index import code_table_path, base_code_set_version
+
+build_code_table(codes_list, base_code_set_version, code_table_path)
+
+# Checks the table against the source
+code_table = CodeTable(code_table_path)
+missing = [code for code in codes_list if code not in code_table]
+if missing != [] or len(code_table) != len(set(codes_list)):
+    print(f"Code table does not match full_codes.py ({len(missing)} codes missing)")
+    sys.exit(1)
+print(f"Wrote {len(code_table)} codes to {code_table_path}")
@@ -0,0 +1,85 @@
+import sys
+
+if __name__ == "__main__":
+    print("This is not the main module. Do not execute directly.")
+    sys.exit()
+
+import gzip
+from os import path
+from code_index import CodeIndex, get_code_index
+
+# Built by build_code_descriptions.py from CMS's code description files
+descriptions_path = path.join(path.dirname(path.abspath(__file__)), "full_codes_descriptions.txt.gz")
+
+# Local store of CMS ICD-10 code descriptions
+# Lets CodeM UP reject unknown or retired codes before they are typed into PCC, and show descriptions in the Excel file.
+# The store is a gzipped text file with one sorted line per code: code (no dot), status ("" = current, "R" = retired) and description,
+# separated by tabs. It is only read the first time a description or status is needed.
+class CodeDescriptions:
+    def __init__(self, descriptions_path: str):
+        self.descriptions_path = descriptions_path
+        self._descriptions = None # {code: (description, retired)}. Loaded on first use.
+
+    # True if the store file exists (build_code_descriptions.py has been run)
+    @property
+    def available(self): return path.isfile(self.descriptions_path)
+
+    # Reads the whole store into memory
+    def load(self):
+        self._descriptions = {}
+        if not self.available: return
+        with gzip.open(self.descriptions_path, "rt", encoding = "utf-8") as descriptions_file:
+            for line in descriptions_file:
+                code, status, description = line.rstrip("\n").split("\t", 2)
+                self._descriptions[code] = (description, status == "R")
+
+    # Returns the description of a code (current or retired). Returns "" if the code is unknown or the store is not available.
+    def describe(self, code: str):
+        if self._descriptions == None: self.load()
+        return self._descriptions.get(CodeIndex.normalize(code), ("", False))[0]
+
+    # Returns "valid", "retired" or "unknown"
+    # code_index (default: the code set PCC uses today) decides whether the code is valid. The store only tells retired codes
+    # (codes CMS used to have) apart from codes that never existed, so without the store a code can only be "valid" or "unknown".
+    def check_code(self, code: str, code_index = None):
+        if code_index == None: code_index = get_code_index()
+        if code in code_index: return "valid"
+
+        if self._descriptions == None: self.load()
+        if code_index.normalize(code) in self._descriptions: return "retired"
+        return "unknown"
+
+# Writes the store from CMS code files (e.g., icd10cm_codes_2022.txt from https://www.cms.gov/medicare/icd-10)
+# cms_code_files must be in release order, oldest first. Codes in the newest file are current. Codes only in older files are retired
+# and keep their last description.
+def build_code_descriptions(cms_code_files: list, out_path: str):
+    descriptions = {}
+    for cms_code_file in cms_code_files:
+        current = read_cms_codes(cms_code_file)
+        for code in descriptions: descriptions[code] = (descriptions[code][0], code not in current)
+        for code, description in current.items(): descriptions[code] = (description, False)
+
+    with gzip.open(out_path, "wt", encoding = "utf-8") as descriptions_file:
+        for code in sorted(descriptions):
+            description, retired = descriptions[code]
+            if retired: status = "R"
+            else: status = ""
+            descriptions_file.write(f"{code}\t{status}\t{description}\n")
+    return len(descriptions)
+
+# Returns {code: description} from a CMS code file. CMS lines are the code padded to 8 characters followed by the description.
+def read_cms_codes(cms_code_file: str):
+    codes = {}
+    with open(cms_code_file, "r", encoding = "utf-8", errors = "replace") as code_file:
+        for line in code_file:
+            if line.strip() == "": continue
+            codes[line[:8].strip().upper()] = line[8:].strip()
+    return codes
+
+_code_descriptions = None
+
+# Returns the shared CodeDescriptions store
+def get_code_descriptions():
+    global _code_descriptions
+    if _code_descriptions == None: _code_descriptions = CodeDescriptions(descriptions_path)
+    return _code_descriptions
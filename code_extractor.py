@@ -0,0 +1,120 @@
+import sys
+
+if __name__ == "__main__":
+    print("This is not the main module. Do not execute directly.")
+    sys.exit()
+
+import re, hashlib
+from bisect import bisect_right
+
+# ICD-10 format. Compiled once rather than on every page.
+# I referenced https://library.ahima.org/doc?oid=106177#.Y1XHwnbMK5c to build the regular expression to match the ICD-10 format
+ICD10_PATTERN = re.compile(r"[A-Z]\d{2}\.?\w{0,4}")
+
+# Finds valid ICD-10 codes in page text
+# Found codes are kept in a dict (insertion-ordered set), so checking for an already found code does not get slower as more codes are found.
+# One CodeExtractor is used per document; call reset() before scanning a new document.
+# Packets repeat the same pages and header/footer lines many times. skip_repeats scans repeated text once:
+#   "pages" = a page whose text (ignoring whitespace) was already scanned is skipped
+#   "lines" = also skips every line already scanned on an earlier page (catches near-identical pages and boilerplate lines)
+# A code can't span lines, so skipped text can only hold codes that were already found. Hit counts are remembered for skipped
+# text, so codes and page_hits are exactly the same as with skip_repeats = "off".
+class CodeExtractor:
+    skip_repeats_options = ("off", "pages", "lines")
+
+    def __init__(self, code_index, skip_repeats: str = "off"):
+        self.code_index = code_index # CodeIndex used to validate regex matches
+        self.skip_repeats = skip_repeats
+        self.reset()
+
+    # Clears all results from a previous document
+    def reset(self):
+        self.found_codes = {} # Keys are the codes found in the document, in the order they were first found. Values are unused.
+        self.page_hits = [] # Number of valid code matches on each page (repeats included). Side output for reporting.
+        self.page_fingerprints = {} # {hash of whitespace-normalized page text: hit count} for pages already scanned
+        self.line_fingerprints = {} # {hash of whitespace-normalized line: hit count} for lines already scanned
+        self.skipped_bytes = 0 # Bytes (UTF-8) of repeated text that did not need scanning
+
+    # All codes found so far, in the order they were first found
+    @property
+    def codes(self): return list(self.found_codes)
+
+    # Scans one page's text. Records the page's hit count and returns a list of codes not found on any earlier page.
+    # Candidates whose category doesn't exist are rejected before the full lookup.
+    def scan_page(self, page_text: str):
+        if self.skip_repeats == "off":
+            hits = self.find_hits(page_text)
+            self.page_hits.append(len(hits))
+            return self.add_codes(hits)
+
+        fingerprint = hashlib.blake2b(" ".join(page_text.split()).encode("utf-8"), digest_size = 16).digest()
+        if fingerprint in self.page_fingerprints: # Same text as an earlier page
+            self.page_hits.append(self.page_fingerprints[fingerprint])
+            self.skipped_bytes += len(page_text.encode("utf-8"))
+            return []
+
+        if self.skip_repeats == "lines": hits, hit_count = self.scan_new_lines(page_text)
+        else:
+            hits = self.find_hits(page_text)
+            hit_count = len(hits)
+        self.page_fingerprints[fingerprint] = hit_count
+        self.page_hits.append(hit_count)
+        return self.add_codes(hits)
+
+    # Returns the valid codes on the page's lines that were not on an earlier page, and the page's total hit count (repeated lines included)
+    def scan_new_lines(self, page_text: str):
+        hits = []
+        hit_count = 0
+        line_fingerprints = self.line_fingerprints
+        for line in page_text.split("\n"):
+            line_key = hash(" ".join(line.split()))
+            if line_key in line_fingerprints:
+                hit_count += line_fingerprints[line_key]
+                self.skipped_bytes += len(line.encode("utf-8"))
+                continue
+            line_hits = self.find_hits(line)
+            line_fingerprints[line_key] = len(line_hits)
+            hit_count += len(line_hits)
+            hits.extend(line_hits)
+        return hits, hit_count
+
+    # Returns the valid codes in text, in order (repeats included)
+    def find_hits(self, text: str):
+        return self.code_index.validate_many(self.code_index.category_prefilter(ICD10_PATTERN.findall(text)))
+
+    # Scans a list of pages' text
+    # single_scan = True joins the pages into one buffer and runs the regex once over it instead of once per page.
+    # Matches cannot cross the newline used to join pages, so the results are the same either way.
+    def scan_pages(self, pages: list, single_scan: bool = False):
+        if not single_scan:
+            for page_text in pages: self.scan_page(page_text)
+            return self.codes
+
+        # Offset of the start of each page within the joined buffer. Used to find which page a match came from.
+        page_starts = []
+        offset = 0
+        for page_text in pages:
+            page_starts.append(offset)
+            offset += len(page_text) + 1 # + 1 for the joining newline
+
+        page_hits = [0] * len(pages)
+        hits = []
+        categories = self.code_index.categories
+        for match in ICD10_PATTERN.finditer("\n".join(pages)):
+            code = match.group()
+            if code[:3] not in categories or self.code_index.lookup(code) == None: continue
+            hits.append(code)
+            page_hits[bisect_right(page_starts, match.start()) - 1] += 1
+
+        self.page_hits.extend(page_hits)
+        self.add_codes(hits)
+        return self.codes
+
+    # Adds valid codes to the found codes. Returns the ones that had not been found before.
+    def add_codes(self, codes):
+        new_codes = []
+        for code in codes:
+            if code in self.found_codes: continue
+            self.found_codes[code] = None
+            new_codes.append(code)
+        return new_codes
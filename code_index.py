@@ -0,0 +1,155 @@
+import sys
+
+if __name__ == "__main__":
+    print("This is not the main module. Do not execute directly.")
+    sys.exit()
+
+import datetime
+from os import path
+from bisect import bisect_left
+from code_table import CodeTable, InvalidCodeTable
+from code_sets import CodeSetDeltas, CodeSetVersion, UnknownCodeSetVersion, deltas_path
+
+base_code_set_version = "2022" # CMS release full_codes.py was taken from
+code_table_path = path.join(path.dirname(path.abspath(__file__)), "full_codes.bin") # Built by build_code_table.py
+
+# Hashed index of all valid ICD-10 codes
+# full_codes.codes_list is a tuple, so "code in codes_list" scans all ~72k codes. This index is built once and gives O(1) membership.
+# Codes are keyed by their normalized form (no dots, no surrounding whitespace, uppercase), so "E11.9", "E119" and "e11.9" all find the same code.
+# version identifies the code set (e.g., CMS release year). Anything cached from an older version is not reused.
+# Hierarchy lookups (all codes under E11, children of E11.6, etc.) use a sorted array of the codes searched with bisect.
+# ICD-10 is a prefix hierarchy: the first 3 characters are the category and each further character narrows it down.
+# codes can also be a CodeTable (memory-mapped binary table). The table is then used directly for membership and as the sorted array,
+# so no str object is created per code.
+# codes can also be a CodeSetVersion (base code set plus a later release's changes, see code_sets.py).
+class CodeIndex:
+    def __init__(self, codes, version: str):
+        self.version = version
+        if isinstance(codes, CodeTable):
+            self.codes = codes
+            self.categories = codes.categories()
+            self._sorted_codes = codes
+        elif isinstance(codes, CodeSetVersion):
+            self.codes = codes
+            self.categories = codes.categories()
+            self._sorted_codes = None
+        else:
+            self.codes = frozenset(self.normalize(code) for code in codes)
+            self.categories = frozenset(code[:3] for code in self.codes) # Every 3-character category with at least one code
+            self._sorted_codes = None # Built the first time a hierarchy lookup needs it
+
+    def __contains__(self, code): return self.lookup(code) != None
+
+    def __len__(self): return len(self.codes)
+
+    # Returns the normalized key for a code (e.g., " e11.9 " -> "E119")
+    @staticmethod
+    def normalize(code: str): return code.strip().replace(".", "").upper()
+
+    # Returns the normalized code if it is a valid ICD-10 code. Returns None if not.
+    def lookup(self, code: str):
+        key = self.normalize(code)
+        if key in self.codes: return key
+        return None
+
+    # Returns the code in its dotted form (e.g., "E119" -> "E11.9"). Returns None if the code is not valid.
+    # Codes with only 3 characters (categories, e.g., "A09") have no dot.
+    def dotted(self, code: str):
+        key = self.lookup(code)
+        if key == None: return None
+        if len(key) == 3: return key
+        return key[:3] + "." + key[3:]
+
+    # Receives any iterable of candidate codes. Returns a list of the candidates that are valid codes, in their original form and order.
+    def validate_many(self, codes):
+        valid_codes = self.codes # Local reference avoids the attribute lookup in the loop
+        return [code for code in codes if code.strip().replace(".", "").upper() in valid_codes]
+
+    # Fast first pass over regex candidates (which always start with a letter and two digits). Returns the ones whose first 3 characters
+    # are a real category. Rejects most junk (page IDs, lab accession numbers, etc.) without normalizing it.
+    def category_prefilter(self, candidates):
+        categories = self.categories
+        return [candidate for candidate in candidates if candidate[:3].upper() in categories]
+
+    # Returns True if code is a valid 3-character category (e.g., "E11"), whether or not it is a code itself
+    def is_category(self, code: str):
+        key = self.normalize(code)
+        return len(key) == 3 and key in self.categories
+
+    # ------------------ Hierarchy ------------------
+    # All codes in sorted order (sorted array used for prefix searches)
+    @property
+    def sorted_codes(self):
+        if self._sorted_codes == None: self._sorted_codes = sorted(self.codes)
+        return self._sorted_codes
+
+    # Returns all valid codes that start with prefix (e.g., "E11" -> all codes under E11), in sorted order
+    # Dots and case in prefix do not matter.
+    def codes_with_prefix(self, prefix: str):
+        prefix = self.normalize(prefix)
+        sorted_codes = self.sorted_codes
+        start = bisect_left(sorted_codes, prefix)
+        end = start
+        while end < len(sorted_codes) and sorted_codes[end].startswith(prefix): end += 1
+        return sorted_codes[start:end]
+
+    # Returns True if any valid code starts with prefix
+    def has_prefix(self, prefix: str):
+        prefix = self.normalize(prefix)
+        sorted_codes = self.sorted_codes
+        i = bisect_left(sorted_codes, prefix)
+        return i < len(sorted_codes) and sorted_codes[i].startswith(prefix)
+
+    # Returns the next level up in the hierarchy (e.g., "E11.65" -> "E116", "E11.6" -> "E11"). Returns None for a category.
+    # The parent is not necessarily a code itself (many levels only exist as headings).
+    def parent(self, code: str):
+        key = self.normalize(code)
+        if len(key) <= 3: return None
+        return key[:-1]
+
+    # Returns the next level down in the hierarchy (e.g., "E11" -> ["E110", "E111", ...]), in sorted order
+    # Each child is a valid code or has valid codes under it.
+    def children(self, code: str):
+        key = self.normalize(code)
+        children = []
+        for child_code in self.codes_with_prefix(key):
+            if len(child_code) == len(key): continue # The code itself
+            child = child_code[:len(key) + 1]
+            if children == [] or children[-1] != child: children.append(child)
+        return children
+
+# Indexes are built the first time each version is needed and then shared by everything that validates codes
+_code_indexes = {} # {version: CodeIndex}
+_code_set_deltas = None
+
+# Returns the shared CodeSetDeltas (available versions and their changes)
+def get_code_set_deltas():
+    global _code_set_deltas
+    if _code_set_deltas == None: _code_set_deltas = CodeSetDeltas(deltas_path, base_code_set_version)
+    return _code_set_deltas
+
+# Returns the shared CodeIndex of a code set version (e.g., "2024")
+# version = None uses the version PCC uses today (see CodeSetDeltas.version_for_date). Only the base set and the requested version are loaded.
+# Raises UnknownCodeSetVersion if the version is not available.
+def get_code_index(version: str = None):
+    if version == None: version = get_code_set_deltas().version_for_date(datetime.date.today())
+    if version not in _code_indexes:
+        if version not in get_code_set_deltas().versions: raise UnknownCodeSetVersion(version, get_code_set_deltas().versions)
+        if version == base_code_set_version: _code_indexes[version] = load_code_index()
+        else:
+            base_index = get_code_index(base_code_set_version)
+            added, deleted = get_code_set_deltas().changes(version, base_index.codes)
+            _code_indexes[version] = CodeIndex(CodeSetVersion(base_index, added, deleted), version)
+    return _code_indexes[version]
+
+# Returns the shared CodeIndex for a code_set_version setting ("auto" = the version PCC uses today, or a version such as "2024")
+# Raises UnknownCodeSetVersion if the setting names a version that is not available.
+def code_index_for_setting(setting: str): return get_code_index(get_code_set_deltas().resolve(setting))
+
+# Loads the base code set from the binary table (fast, see code_table.py). Falls back to full_codes.py if the table is missing or invalid.
+def load_code_index():
+    try: return CodeIndex(CodeTable(code_table_path), base_code_set_version)
+    except (OSError, InvalidCodeTable): pass
+
+    from full_codes import codes_list
+    return CodeIndex(codes_list, base_code_set_version)
@@ -0,0 +1,44 @@
+import sys
+
+if __name__ == "__main__":
+    print("This is not the main module. Do not execute directly.")
+    sys.exit()
+
+# Per Regional Nurse Consultant Amber Baudler, unless otherwise specified, Rank should be "Other" and Classification should always be "Admission"
+default_rank = "Other"
+default_classification = "Admission"
+
+# One row of the codes table, as it is entered into PCC
+# The table is converted once, before the upload starts, so the upload loop reads plain attributes instead of DataFrame cells.
+# Values are stripped strings ("" = blank). Blank Rank and Classification are given their defaults.
+class CodeRow:
+    __slots__ = ("row_num", "code", "resolved_date", "rank", "classification", "comments", "confidential")
+
+    # Details in the order they are entered (the Excel table's column order, A:F)
+    fields = ("code", "resolved_date", "rank", "classification", "comments", "confidential")
+
+    def __init__(self, row_num: int, code: str, resolved_date: str, rank: str, classification: str, comments: str, confidential: str):
+        self.row_num = row_num # Row index in the table (0 = first data row)
+        self.code = code
+        self.resolved_date = resolved_date
+        self.rank = rank or default_rank
+        self.classification = classification or default_classification
+        self.comments = comments
+        self.confidential = confidential
+
+    # Returns (field, value) for each detail that has a value, in entry order
+    def filled_fields(self):
+        return [(field, getattr(self, field)) for field in self.fields if getattr(self, field) != ""]
+
+    def __repr__(self): return f"CodeRow({self.row_num}, " + ", ".join(repr(getattr(self, field)) for field in self.fields) + ")"
+
+# Returns a list of CodeRows from the codes table (DataframeHandler.df_excel_import_codes). Columns are read by position (A:F).
+# upload_plan.build_upload_plan() builds its CodeRows with this too, from the validated table.
+def code_rows_from_df(df_codes):
+    num_fields = len(CodeRow.fields)
+    code_rows = []
+    for row_num, *values in df_codes.itertuples(name = None): # row_num is the row's index (its row in the table)
+        values = ["" if value == None else str(value).strip() for value in values[:num_fields]]
+        values += [""] * (num_fields - len(values))
+        code_rows.append(CodeRow(row_num, *values))
+    return code_rows
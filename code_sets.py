@@ -0,0 +1,104 @@
+import sys
+
+if __name__ == "__main__":
+    print("This is not the main module. Do not execute directly.")
+    sys.exit()
+
+import json, datetime
+from os import path
+
+# Built by build_code_set_delta.py from CMS code files
+deltas_path = path.join(path.dirname(path.abspath(__file__)), "code_set_deltas.json")
+
+# Versioned ICD-10 code sets
+# Only one full code set (the base year, full_codes.bin/full_codes.py) is stored. Every later CMS release is stored as the codes it added
+# and deleted compared to the release before it. A version is the base set plus all deltas up to and including that version.
+# Versions are CMS fiscal years as strings (e.g., "2023"). Fiscal year N starts on Oct 1 of year N - 1, when PCC switches code sets.
+# The deltas file is JSON: {"base": "2022", "deltas": {"2023": {"add": [...], "delete": [...]}, ...}}. Codes are normalized (no dots, uppercase).
+class CodeSetDeltas:
+    def __init__(self, deltas_path: str, base_version: str):
+        self.base_version = base_version
+        self.deltas = {} # {version: {"add": [...], "delete": [...]}}
+        if path.isfile(deltas_path):
+            with open(deltas_path, "r", encoding = "utf-8") as deltas_file: deltas = json.load(deltas_file)
+            if deltas["base"] != base_version: raise InvalidCodeSetDeltas(deltas_path, deltas["base"], base_version)
+            self.deltas = deltas["deltas"]
+
+    # All available versions, oldest first
+    @property
+    def versions(self): return [self.base_version] + sorted(version for version in self.deltas if version > self.base_version)
+
+    # Returns the version PCC uses on a date: the fiscal year the date falls in, or the newest available version before it
+    # Dates before the base version's fiscal year use the base version.
+    def version_for_date(self, date: datetime.date):
+        fiscal_year = str(date.year + 1) if date.month >= 10 else str(date.year)
+        available = [version for version in self.versions if version <= fiscal_year]
+        if available == []: return self.base_version
+        return available[-1]
+
+    # Returns the version for a code_set_version setting: "auto" (or "") = today's fiscal year, otherwise the named version
+    # Raises UnknownCodeSetVersion if the named version is not available.
+    def resolve(self, setting: str):
+        setting = setting.strip()
+        if setting == "" or setting.lower() == "auto": return self.version_for_date(datetime.date.today())
+        if setting not in self.versions: raise UnknownCodeSetVersion(setting, self.versions)
+        return setting
+
+    # Returns (added, deleted): the codes version adds to and deletes from the base set (sets of normalized codes)
+    # base_codes is used to keep added codes that are already in the base set (and deleted codes that are not) out of the result.
+    def changes(self, version: str, base_codes):
+        added, deleted = set(), set()
+        for delta_version in self.versions[1:]:
+            if delta_version > version: break
+            for code in self.deltas[delta_version]["add"]:
+                deleted.discard(code)
+                if code not in base_codes: added.add(code)
+            for code in self.deltas[delta_version]["delete"]:
+                added.discard(code)
+                if code in base_codes: deleted.add(code)
+        return added, deleted
+
+# One version of the code set: the base set's codes with a version's changes laid over them
+# The base set is shared by every version (never copied), so each extra version only costs its added and deleted codes.
+# Can be given to CodeIndex in place of a full set of codes.
+class CodeSetVersion:
+    def __init__(self, base_index, added: set, deleted: set):
+        self.base_index = base_index
+        self.base_codes = base_index.codes # Base set's codes (CodeTable or frozenset of normalized codes)
+        self.added = frozenset(added)
+        self.deleted = frozenset(deleted)
+
+    # Same membership rules as CodeIndex: dots, case and surrounding whitespace do not matter
+    def __contains__(self, code):
+        key = code.strip().replace(".", "").upper()
+        if key in self.added: return True
+        return key not in self.deleted and key in self.base_codes
+
+    def __len__(self): return len(self.base_codes) - len(self.deleted) + len(self.added)
+
+    # All codes, in sorted order
+    def __iter__(self):
+        return iter(sorted([code for code in self.base_codes if code not in self.deleted] + list(self.added)))
+
+    # Returns the set of 3-character categories in this version
+    def categories(self):
+        categories = set(self.base_index.categories)
+        # A category only disappears if all of its codes were deleted
+        for category in {code[:3] for code in self.deleted}:
+            if all(code in self.deleted for code in self.base_index.codes_with_prefix(category)): categories.discard(category)
+        categories.update(code[:3] for code in self.added)
+        return frozenset(categories)
+
+# ----------------------------EXCEPTIONS CLASSES----------------------------
+# Raised if the deltas file was built against a different base code set
+class InvalidCodeSetDeltas(Exception):
+    def __init__(self, deltas_path, deltas_base, base_version):
+        message = f"{deltas_path} was built on the {deltas_base} code set, but the base code set is {base_version}. Rebuild it with build_code_set_delta.py."
+        super().__init__(message)
+
+# Raised if the code_set_version setting names a version that is not available
+class UnknownCodeSetVersion(Exception):
+    def __init__(self, version, versions):
+        self.version = version
+        message = f"Code set version {version} is not available. Available versions: {', '.join(versions)}."
+        super().__init__(message)
@@ -0,0 +1,103 @@
+import sys
+
+if __name__ == "__main__":
+    print("This is not the main module. Do not execute directly.")
+    sys.exit()
+
+import mmap, struct
+from array import array
+
+# Compact binary copy of the ICD-10 code set
+# full_codes.py is a 760 KB tuple literal that Python unmarshals at every launch and then keeps ~72k separate str objects alive.
+# The binary table is a short header followed by the normalized codes (no dots, uppercase) as sorted, fixed-width, space-padded records.
+# The file is memory-mapped, so loading it costs almost nothing and codes are only turned into str objects when they are looked at.
+# Membership uses a hash table of record numbers (see hash_slots()): ~0.5 MB of integers in one array instead of a set of ~72k str objects.
+# CodeTable is also a sorted sequence, so bisect works on it directly.
+# Build the table with build_code_table.py whenever full_codes.py changes.
+
+# Header: magic, code set version (space-padded), record width, number of records
+header_format = "<4s8sBI"
+header_size = struct.calcsize(header_format)
+magic = b"CMCT"
+
+# Writes codes to a binary table file
+def build_code_table(codes, version: str, table_path: str, record_width: int = 7):
+    records = sorted({code.strip().replace(".", "").upper() for code in codes})
+    with open(table_path, "wb") as table_file:
+        table_file.write(struct.pack(header_format, magic, version.encode("ascii").ljust(8), record_width, len(records)))
+        table_file.write(b"".join(code.encode("ascii").ljust(record_width) for code in records))
+
+class CodeTable:
+    def __init__(self, table_path: str):
+        with open(table_path, "rb") as table_file:
+            self.table = mmap.mmap(table_file.fileno(), 0, access = mmap.ACCESS_READ)
+
+        table_magic, version, self.record_width, self.num_records = struct.unpack(header_format, self.table[:header_size])
+        if table_magic != magic or len(self.table) != header_size + self.record_width * self.num_records:
+            raise InvalidCodeTable(table_path)
+        self.version = version.decode("ascii").strip()
+        self._hash_slots = None # Built the first time membership is checked
+
+    def __len__(self): return self.num_records
+
+    # Returns the code (str) at position i, or a list of codes for a slice
+    def __getitem__(self, i):
+        if isinstance(i, slice): return [self[j] for j in range(*i.indices(self.num_records))]
+        if i < 0: i += self.num_records
+        if i < 0 or i >= self.num_records: raise IndexError("CodeTable index out of range")
+        return self.record(i).decode("ascii").rstrip()
+
+    def __iter__(self):
+        for i in range(self.num_records): yield self[i]
+
+    # Same membership rules as CodeIndex: dots, case and surrounding whitespace do not matter
+    def __contains__(self, code):
+        key = code.strip().replace(".", "").upper().encode("ascii", "replace")
+        if len(key) > self.record_width: return False
+        key = key.ljust(self.record_width)
+
+        # Compares the key with the records in its slot (and the slots after it, until an empty one) straight from the table
+        table, width, slots = self.table, self.record_width, self._hash_slots
+        if slots == None: slots = self.hash_slots()
+        mask = len(slots) - 1
+        slot = hash(key) & mask
+        while slots[slot] != 0:
+            start = header_size + (slots[slot] - 1) * width
+            if table[start:start + width] == key: return True
+            slot = (slot + 1) & mask
+        return False
+
+    # Returns the hash table used for membership: an array of record numbers + 1 (0 = empty slot), placed by the hash of the record
+    # (open addressing; a taken slot moves the record to the next free one). Slots are a power of two, at least the number of records.
+    # Built from the table in one pass (~0.5 MB for ~72k codes). Python's hash() changes between sessions, so it is never saved.
+    def hash_slots(self):
+        if self._hash_slots == None:
+            table, width = self.table, self.record_width
+            mask = (1 << self.num_records.bit_length()) - 1
+            slots = array("I", bytes(4 * (mask + 1)))
+            for record_num, start in enumerate(range(header_size, len(table), width), 1):
+                slot = hash(table[start:start + width]) & mask
+                while slots[slot] != 0: slot = (slot + 1) & mask
+                slots[slot] = record_num
+            self._hash_slots = slots
+        return self._hash_slots
+
+    # Raw bytes of record i
+    def record(self, i: int):
+        start = header_size + i * self.record_width
+        return self.table[start:start + self.record_width]
+
+    # Returns the set of 3-character categories in the table
+    def categories(self):
+        table, width = self.table, self.record_width
+        category_bytes = {table[start:start + 3] for start in range(header_size, len(table), width)}
+        return frozenset(category.decode("ascii") for category in category_bytes)
+
+    def close(self): self.table.close()
+
+# ----------------------------EXCEPTIONS CLASSES----------------------------
+# Raised if a code table file is not a valid table (wrong format, truncated, etc.)
+class InvalidCodeTable(Exception):
+    def __init__(self, table_path):
+        message = f"{table_path} is not a valid code table. Rebuild it with build_code_table.py."
+        super().__init__(message)
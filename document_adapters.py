@@ -0,0 +1,139 @@
+import sys
+
+if __name__ == "__main__":
+    print("This is not the main module. Do not execute directly.")
+    sys.exit()
+
+import zipfile
+import xml.etree.ElementTree as ET
+from os import path
+
+# Input adapters for documents that are not PDFs (plain text exports, Word documents, C-CDA/CCD XML)
+# They stand in for a PDF backend (see pdf_processing.pdf_backends), so their pages go through the same code extraction, repeat skipping,
+# targeted sections and cache as PDF pages.
+# Files are read incrementally and each page is yielded as soon as it is complete, so multi-megabyte documents never have to fit in memory.
+# The page count is not known until the whole file has been read, so num_pages is None; pages are always read in order, all of them.
+# "Pages" are form-feed/size-based chunks for text, page breaks for Word documents and sections for XML.
+
+# Plain text. Pages are split at form feeds or every lines_per_page lines.
+class TextAdapter:
+    lines_per_page = 60
+
+    def __init__(self, doc_path: str):
+        self.doc_path = doc_path
+        self.num_pages = None
+        with open(doc_path, "rb"): pass # Raises now if the file can't be opened, like the PDF backends do
+
+    # Generator that yields each page's text
+    def iter_pages(self):
+        page_lines = []
+        with open(self.doc_path, "r", encoding = "utf-8-sig", errors = "replace") as text_file:
+            for line in text_file:
+                while "\f" in line:
+                    before_break, line = line.split("\f", 1)
+                    page_lines.append(before_break)
+                    yield "".join(page_lines)
+                    page_lines = []
+                page_lines.append(line)
+                if len(page_lines) >= self.lines_per_page:
+                    yield "".join(page_lines)
+                    page_lines = []
+        if page_lines != []: yield "".join(page_lines)
+
+# Word document (.docx). word/document.xml is streamed out of the zip file with iterparse. Each paragraph is a line.
+# Pages are split at page breaks (manual or where Word last laid out a page) or every paragraphs_per_page paragraphs.
+class DocxAdapter:
+    paragraphs_per_page = 60
+    word_ns = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+    def __init__(self, doc_path: str):
+        self.doc_path = doc_path
+        self.num_pages = None
+        with zipfile.ZipFile(doc_path) as docx_file: docx_file.getinfo("word/document.xml") # Raises now if this is not a Word document
+
+    def iter_pages(self):
+        w = self.word_ns
+        page_lines = []
+        paragraph = []
+        with zipfile.ZipFile(self.doc_path) as docx_file, docx_file.open("word/document.xml") as document_xml:
+            for event, element in ET.iterparse(document_xml, events = ("end",)):
+                if element.tag == w + "t": paragraph.append(element.text or "")
+                elif element.tag == w + "tab": paragraph.append("\t")
+                elif element.tag == w + "lastRenderedPageBreak" or (element.tag == w + "br" and element.get(w + "type") == "page"):
+                    page_lines.append("".join(paragraph))
+                    paragraph = []
+                    yield "\n".join(page_lines)
+                    page_lines = []
+                elif element.tag == w + "p":
+                    page_lines.append("".join(paragraph))
+                    paragraph = []
+                    element.clear() # Drops the paragraph's parsed runs
+                    if len(page_lines) >= self.paragraphs_per_page:
+                        yield "\n".join(page_lines)
+                        page_lines = []
+        if paragraph != []: page_lines.append("".join(paragraph))
+        if page_lines != []: yield "\n".join(page_lines)
+
+# C-CDA/CCD XML. Coded ICD-10-CM values (<value code="E11.9" codeSystem="2.16.840.1.113883.6.90" .../>, translations, etc.) are read
+# straight from their attributes, one per line, along with the document's narrative text (for codes only written in the text).
+# Each section is a page, so sources in the Excel file point to the section a code came from.
+class CdaAdapter:
+    icd10cm_oid = "2.16.840.1.113883.6.90" # HL7 code system ID of ICD-10-CM
+    max_page_lines = 2000 # Long sections are split so a page never grows without limit
+
+    def __init__(self, doc_path: str):
+        self.doc_path = doc_path
+        self.num_pages = None
+        with open(doc_path, "rb"): pass
+
+    # Lines are in document order: a parent's text comes before its children's, and a child's tail text before its next sibling's.
+    # A piece of text is only complete once the parser reaches the next tag, so each one is collected at the next start or end event:
+    # an element's text when its first child starts (or when it ends, if it has none), a child's tail when the next child starts
+    # (or when the parent ends). Children are removed once their tail is collected.
+    def iter_pages(self):
+        page_lines = []
+        open_elements = [] # [element, text collected, last child that has ended] for each element not yet ended, outermost first
+        for event, element in ET.iterparse(self.doc_path, events = ("start", "end")):
+            if event == "start":
+                if open_elements != []: self.collect_text(open_elements[-1], page_lines)
+                if element.get("code") != None and self.is_icd10cm(element): page_lines.append(element.get("code"))
+                open_elements.append([element, False, None])
+                continue
+
+            self.collect_text(open_elements.pop(), page_lines)
+            if open_elements != []: open_elements[-1][2] = element
+
+            tag = element.tag.rsplit("}", 1)[-1] # Drops the namespace
+            if (tag == "section" and page_lines != []) or len(page_lines) >= self.max_page_lines:
+                yield "\n".join(page_lines)
+                page_lines = []
+        if page_lines != []: yield "\n".join(page_lines)
+
+    # Adds the text of an open element (see iter_pages()) that is complete now that the parser has reached its next child or its end:
+    # its own text the first time, afterwards the tail of its last ended child (which is then removed)
+    @staticmethod
+    def collect_text(open_element: list, page_lines: list):
+        element, text_collected, last_child = open_element
+        if not text_collected:
+            text = element.text
+            open_element[1] = True
+        elif last_child != None:
+            text = last_child.tail
+            element.remove(last_child)
+            open_element[2] = None
+        else: return
+        if text != None and text.strip() != "": page_lines.append(text.strip())
+
+    # True if a coded element is from ICD-10-CM
+    def is_icd10cm(self, element):
+        if element.get("codeSystem") == self.icd10cm_oid: return True
+        code_system_name = element.get("codeSystemName", "").upper().replace("-", "").replace(" ", "")
+        return code_system_name in ("ICD10", "ICD10CM")
+
+document_adapters = {".txt": TextAdapter, ".docx": DocxAdapter, ".xml": CdaAdapter}
+
+# File extensions that can be imported (PDFs and every adapter's)
+supported_extensions = (".pdf",) + tuple(document_adapters)
+
+# Returns the adapter class for a file, or None for PDFs (and anything else)
+def adapter_for(doc_path: str): return document_adapters.get(path.splitext(doc_path)[1].lower())
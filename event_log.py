@@ -0,0 +1,68 @@
+import sys
+
+if __name__ == "__main__":
+    print("This is not the main module. Do not execute directly.")
+    sys.exit()
+
+import json, time, os
+from buffered_writer import get_buffered_writer
+
+# Structured log of the PCC upload: one JSON object per line for each step (find New Diagnosis, enter code, description wait, save,
+# window cleanup, and the WebdriverMain element lookups, clicks and typing inside them)
+# Each line has the run, code, step, start and end (time.monotonic() seconds), seconds taken, outcome ("ok", "failed", "error") and retries,
+# plus any details. Lines go through a BufferedWriter (see buffered_writer.py), so a step costs a json.dumps and a queue put.
+# Shows where the time per code goes, e.g.:
+#   python -c "import pandas as pd; print(pd.read_json('CM_event_log.jsonl', lines = True).groupby('step').seconds.describe())"
+class EventLog:
+    max_log_bytes = 2 * 1024 * 1024
+
+    # log_path = "" turns the log off (steps are still timed, nothing is written)
+    def __init__(self, log_path: str):
+        self.writer = None
+        if log_path != "": self.writer = get_buffered_writer(log_path, "", self.max_log_bytes)
+        self.run = f"{int(time.time())}-{os.getpid()}" # Tells runs apart in the file
+        self.code = "" # Code being entered. Steps without their own code are logged with it (e.g., WebdriverMain's).
+
+    # Logs one step. start and end are time.monotonic() values (end = now if not given).
+    def emit(self, step: str, start: float, outcome: str = "ok", end: float = None, code: str = None, retries: int = 0, **details):
+        if self.writer == None: return
+        if end == None: end = time.monotonic()
+        if code == None: code = self.code
+        event = {
+            "run": self.run, "code": code, "step": step, "start": round(start, 4), "end": round(end, 4),
+            "seconds": round(end - start, 4), "outcome": outcome, "retries": retries
+        }
+        if details != {}: event.update(details)
+        self.writer.write(json.dumps(event, default = str) + "\n")
+
+    # Times a with block as one step. Set outcome/retries/details on the returned EventStep inside the block.
+    # The outcome is "error" if the block raises.
+    def step(self, step: str, code: str = None): return EventStep(self, step, code)
+
+    def flush(self):
+        if self.writer != None: self.writer.flush(5)
+
+class EventStep:
+    __slots__ = ("event_log", "step", "code", "start", "outcome", "retries", "details")
+
+    def __init__(self, event_log: EventLog, step: str, code: str):
+        self.event_log = event_log
+        self.step = step
+        self.code = code
+        self.outcome = "ok"
+        self.retries = 0
+        self.details = {}
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type != None: self.outcome = "error"
+        self.event_log.emit(self.step, self.start, self.outcome, code = self.code, retries = self.retries, **self.details)
+        return False
+
+    # Sets the outcome from a PccHandler/WebdriverMain return value (False = failed, anything else = ok) and returns the value
+    def result(self, value):
+        if value == False: self.outcome = "failed"
+        return value
@@ -0,0 +1,110 @@
+import sys
+
+if __name__ == "__main__":
+    print("This is not the main module. Do not execute directly.")
+    sys.exit()
+
+import os, gzip, json, hashlib
+
+# On-disk cache of PDF extraction results
+# Entries are keyed by the SHA-256 of the PDF's bytes plus a signature of everything else that affects the results (code set version, etc.),
+# so a re-imported PDF is recognized even if it was renamed or moved, and a changed code set never reuses old results.
+# Each entry is a gzipped JSON-lines file: a first line with the page count, then one line per imported page with the page number, its text,
+# the codes first found on it and its hit count.
+# Entries are written one page at a time as the PDF is scanned, so caching does not keep the whole document in memory.
+# Total size is capped; the least recently used entries (oldest modified time, refreshed on every read) are deleted first.
+class ExtractionCache:
+    file_ext = ".jsonl.gz"
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok = True)
+
+    # Returns the cache key for a PDF. signature is any string describing the other inputs that affect the results.
+    # Raises OSError if the file cannot be read.
+    @staticmethod
+    def key_for(pdf_path: str, signature: str):
+        file_hash = hashlib.sha256()
+        with open(pdf_path, "rb") as pdf_file:
+            for chunk in iter(lambda: pdf_file.read(1024 * 1024), b""): file_hash.update(chunk)
+        file_hash.update(b"\0" + signature.encode("utf-8"))
+        return file_hash.hexdigest()
+
+    def __contains__(self, key: str): return os.path.isfile(self.entry_path(key))
+
+    # Path of the cache entry for a key
+    def entry_path(self, key: str): return os.path.join(self.cache_dir, key + self.file_ext)
+
+    # Generator that yields (num_pages, page_num, text, new_codes, hits) for each cached page (only the imported pages, see PdfProcessing.select_pages())
+    # Marks the entry as recently used. Raises an exception if the entry is missing or corrupt.
+    def read_pages(self, key: str):
+        entry_path = self.entry_path(key)
+        os.utime(entry_path) # Refreshes modified time for LRU eviction
+        with gzip.open(entry_path, "rt", encoding = "utf-8") as entry:
+            num_pages = json.loads(entry.readline())["num_pages"]
+            for line in entry:
+                page = json.loads(line)
+                yield num_pages, page["page"], page["text"], page["new_codes"], page["hits"]
+
+    # Deletes an entry (e.g., if it turned out to be corrupt)
+    def remove(self, key: str):
+        try: os.remove(self.entry_path(key))
+        except OSError: pass
+
+    # Returns a CacheWriter for a new entry
+    def open_writer(self, key: str, num_pages: int): return CacheWriter(self, key, num_pages)
+
+    # Deletes the least recently used entries until the cache fits in self.max_bytes
+    def evict(self):
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith(self.file_ext): continue
+            try: stat = os.stat(os.path.join(self.cache_dir, file_name))
+            except OSError: continue
+            entries.append((stat.st_mtime, stat.st_size, file_name))
+
+        total_bytes = sum(entry[1] for entry in entries)
+        for mtime, size, file_name in sorted(entries):
+            if total_bytes <= self.max_bytes: break
+            try: os.remove(os.path.join(self.cache_dir, file_name))
+            except OSError: continue
+            total_bytes -= size
+
+# Writes one cache entry a page at a time
+# The entry is written to a temporary file and only renamed into place by commit(), so an interrupted import never leaves a partial entry.
+# Failing to write the cache (disk full, etc.) never stops an import; the entry is just not saved.
+class CacheWriter:
+    def __init__(self, cache: ExtractionCache, key: str, num_pages: int):
+        self.cache = cache
+        self.key = key
+        self.temp_path = cache.entry_path(key) + ".tmp"
+        self.entry = None
+        try:
+            self.entry = gzip.open(self.temp_path, "wt", encoding = "utf-8")
+            self.entry.write(json.dumps({"num_pages": num_pages}) + "\n")
+        except OSError: self.discard()
+
+    def add_page(self, page_num: int, text: str, new_codes: list, hits: int):
+        if self.entry == None: return
+        try: self.entry.write(json.dumps({"page": page_num, "text": text, "new_codes": new_codes, "hits": hits}) + "\n")
+        except OSError: self.discard()
+
+    # Finishes the entry and makes it available. Evicts old entries if the cache is now over its size cap.
+    def commit(self):
+        if self.entry == None: return
+        try:
+            self.entry.close()
+            os.replace(self.temp_path, self.cache.entry_path(self.key))
+            self.cache.evict()
+        except OSError: self.discard()
+        self.entry = None
+
+    # Abandons the entry
+    def discard(self):
+        if self.entry != None:
+            try: self.entry.close()
+            except OSError: pass
+            self.entry = None
+        try: os.remove(self.temp_path)
+        except OSError: pass
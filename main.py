@@ -5,37 +5,75 @@
 
 import sys
 
-if __name__ != "__main__":
+if __name__ not in ("__main__", "__mp_main__"):
     print("This is the main module. Do not call.")
     sys.exit()
 
 import csv
-from tkinter_handler import CCWindow
-
-# Reading in all settings to settings_dict
-with open("CM_Settings.csv", "r") as cm_settings:
-    reader = csv.reader(cm_settings)
-    settings_list = [row for row in reader]
-    settings_dict = {ele[0]: ele[1] for ele in settings_list}
-
-# Instantiating main window (starting Codey McCodeface)
-CC_main = CCWindow(
-    settings_dict["pdf_default_dir"], # Directory user starts in when dialog window opens to import PDF
-    settings_dict["excel_file_path"], # Excel file used to save and read code data
-    settings_dict["excel_file_sheet_name"], # Name of the Excel sheet data is written to/read from
-    int(settings_dict["excel_data_first_row"]), # The first row with data in it. Used to write data from PDF in pandas_handler.py.
-    settings_dict["pcc_url"], # Page Chrome navigates to on launch
-    int(settings_dict["window_x"]), # Main window width
-    int(settings_dict["window_y"]), # Main window height
-    settings_dict["template_file_path"], # Original template. Copied over CM_Codes.xlsx every time a PDF is imported.
-    settings_dict["new_diag_button_x"], # New Diagnosis button xpath
-    settings_dict["code_field_x"], # Field to enter ICD-10 code xpath
-    settings_dict["code_desc_x"], # Field with PCC-generated code description xpath
-    settings_dict["admis_date_id"], # ID for admission date in diag_win
-    settings_dict["rank_x"], # Drop-down for Rank xpath
-    settings_dict["clasif_x"], # Drop-down for Classification xpath
-    settings_dict["comm_x"], # Comments field xpath
-    settings_dict["confid_x"], # Confidential checkbox xpath
-    settings_dict["log_file_name"], # Name of file to log errors to
-    settings_dict["FID"]
-)
\ No newline at end of file
+import multiprocessing
+
+# Defaults of settings added after the first release. An older CM_Settings.csv without them still works.
+DEFAULT_SETTINGS = {
+    "pdf_workers": "0",
+    "pdf_cache_dir": "CM_Cache",
+    "pdf_cache_max_mb": "200",
+    "code_set_version": "auto",
+    "pdf_skip_repeats": "lines",
+    "pdf_backend": "PyPDF2",
+    "pdf_targeted_sections": "no",
+    "pdf_page_limits": "all",
+    "working_store": "excel",
+    "event_log_file": "CM_event_log.jsonl",
+}
+
+# On Windows, worker processes (parallel PDF text extraction in pdf_processing.py) re-import this module as "__mp_main__".
+# Everything below must only run in the main process.
+if __name__ == "__main__":
+    multiprocessing.freeze_support() # Needed for worker processes if CodeM UP is run as a frozen executable
+
+    # Startup timing report (what is imported before the window appears and what that costs). Does not start CodeM UP.
+    if "--startup-report" in sys.argv:
+        from startup_report import print_startup_report
+        print_startup_report()
+        sys.exit()
+
+    from tkinter_handler import CCWindow
+
+    # Reading in all settings to settings_dict
+    with open("CM_Settings.csv", "r") as cm_settings:
+        reader = csv.reader(cm_settings)
+        settings_list = [row for row in reader]
+        settings_dict = dict(DEFAULT_SETTINGS) # Settings missing from the file keep their defaults
+        settings_dict.update({ele[0]: ele[1] for ele in settings_list})
+
+    # Instantiating main window (starting Codey McCodeface)
+    CC_main = CCWindow(
+        settings_dict["pdf_default_dir"], # Directory user starts in when dialog window opens to import PDF
+        settings_dict["excel_file_path"], # Excel file used to save and read code data
+        settings_dict["excel_file_sheet_name"], # Name of the Excel sheet data is written to/read from
+        int(settings_dict["excel_data_first_row"]), # The first row with data in it. Used to write data from PDF in pandas_handler.py.
+        settings_dict["pcc_url"], # Page Chrome navigates to on launch
+        int(settings_dict["window_x"]), # Main window width
+        int(settings_dict["window_y"]), # Main window height
+        settings_dict["template_file_path"], # Original template. Copied over CM_Codes.xlsx every time a PDF is imported.
+        settings_dict["new_diag_button_x"], # New Diagnosis button xpath
+        settings_dict["code_field_x"], # Field to enter ICD-10 code xpath
+        settings_dict["code_desc_x"], # Field with PCC-generated code description xpath
+        settings_dict["admis_date_id"], # ID for admission date in diag_win
+        settings_dict["rank_x"], # Drop-down for Rank xpath
+        settings_dict["clasif_x"], # Drop-down for Classification xpath
+        settings_dict["comm_x"], # Comments field xpath
+        settings_dict["confid_x"], # Confidential checkbox xpath
+        settings_dict["log_file_name"], # Name of file to log errors to
+        settings_dict["FID"],
+        int(settings_dict["pdf_workers"]), # Worker processes for extracting text from large PDFs (1 = none, 0 = one per CPU core)
+        settings_dict["pdf_cache_dir"], # Folder for cached PDF extraction results
+        int(settings_dict["pdf_cache_max_mb"]), # Size cap of the PDF cache in MB (0 = no cache)
+        settings_dict["code_set_version"], # ICD-10 code set version ("auto" = the version PCC uses today, or a fiscal year such as "2024")
+        settings_dict["pdf_skip_repeats"], # Repeated PDF text scanned only once: "off", "pages" or "lines" (also repeated lines)
+        settings_dict["pdf_backend"], # Library used to extract PDF text: PyPDF2, pypdf or pdfminer (python benchmarks.py backends picks the fastest)
+        settings_dict["pdf_targeted_sections"].strip().lower() == "yes", # yes = codes only taken from Diagnoses, Problem List, Assessment/Plan, etc.
+        settings_dict["pdf_page_limits"], # Pages imported from each PDF, e.g., "first 20; last 20" ("all" = every page)
+        settings_dict["working_store"], # Where codes are kept: "excel" (CM_Codes.xlsx) or "sqlite" (CM_Codes.db, exported to Excel for editing)
+        settings_dict["event_log_file"] # JSON lines with the timing of each PCC upload step ("" = not written)
+    )
\ No newline at end of file
@@ -7,101 +7,275 @@ if __name__ == "__main__":
 import os
 import pandas as pd # Using DataFrame, read_excel
 import openpyxl as op # Using load_workbook
-import numpy as np # Only using NaN to set default values of NaN to ""
-import shutil as sh
+from openpyxl.utils import column_index_from_string
+from openpyxl.cell.cell import ERROR_CODES
 from error_logger import ErrorLogger
+from sqlite_store import SqliteStore
+from code_descriptions import get_code_descriptions
 
 # Manages all dataframes
 # Dataframes used for codes imported from PDF and when reading from and writing to Excel
 class DataframeHandler:
+    # Reading the Excel file stops after this many blank rows in a row (the template's formatted but empty part of the table).
+    # A few cleared rows (e.g., a deleted code) do not end the data.
+    max_blank_rows = 10
+
     def __init__(self,
                  excel_file_path: str,
                  excel_file_sheet_name: str,
                  excel_data_first_row: int,
                  template_file_path: str,
-                 log_file_name: str
+                 log_file_name: str,
+                 working_store: str = "excel"
                  ):
         self.excel_file_path = excel_file_path
         self.excel_file_sheet_name = excel_file_sheet_name
         self.excel_data_first_row = excel_data_first_row # First row of data
         self.template_file_path = template_file_path
         self.header_list = [] # Headers within Excel file
+        self.source_col = "G" # Column (outside the codes table) listing the PDF(s) and page(s) each imported code was found in
+        self.source_header = "Source (not entered into PCC)"
+        self.desc_col = "H" # Column (outside the codes table) with each imported code's CMS description
+        self.desc_header = "Description (not entered into PCC)"
 
         self.df_excel_import_codes = pd.DataFrame() # Codes imported from Excel
         self.df_pdf_import_codes = pd.DataFrame() # Used for codes imported from PDF
+        self.template_wb = None # Template workbook. Parsed the first time codes are saved and kept for the rest of the session.
+        self.template_values = {} # {(row, column): template value} of the cells the last save changed
+
+        # Cache of the last read of the Excel file. Reading again is skipped while the file is unchanged (same path, mtime, size and sheet).
+        self.read_cache_key = None # [path, mtime in ns, size, sheet name] of the file self.df_excel_import_codes was read from
+        self.read_cache_hits = 0 # Reads this session answered from the cache
+        self.read_cache_misses = 0 # Reads this session that parsed the file
 
         # Setting up the error logger and messages to the user
         self.error_logger = ErrorLogger(log_file_name)
         self.read_codes_from_excel_errmsg = "An error was encountered reading the Excel data back in.\n\n" \
                                             "Please ensure the Excel file is not corrupt and is properly formatted. " \
                                                 "You may need to replace the CM_Codes.xlsx file with the original template file."
+        self.store_errmsg = "An error was encountered using the codes working store.\n\n" \
+                            "You may need to delete the CM_Codes.db file (codes not exported to Excel will be lost)."
+
+        # working_store = "sqlite": codes are kept in a SQLite database next to the Excel file (CM_Codes.db) and the Excel file is only
+        # written and read when codes are exported to it for editing and the edits imported back. "excel" = codes are kept in the Excel file.
+        self.store = None # SqliteStore, or None if codes are kept in the Excel file
+        if working_store.strip().lower() == "sqlite": self.store = SqliteStore(os.path.splitext(excel_file_path)[0] + ".db")
 
     # Called from tkinter_handler.py to create dataframe from codes found in PDF
-    def create_df(self, codes_list: list):
+    # code_sources (optional) is PdfProcessing.code_sources: {code: [(file name, page), ...]}. Adds a "Source" column from it.
+    def create_df(self, codes_list: list, code_sources: dict = None):
         self.df_pdf_import_codes = pd.DataFrame()
         self.df_pdf_import_codes["Codes"] = codes_list
+        if code_sources != None:
+            self.df_pdf_import_codes["Source"] = [
+                "; ".join(f"{file_name} p.{page}" for file_name, page in code_sources[code]) for code in codes_list
+            ]
+
+    # Saves codes found from PDF to the working store (the Excel file or the SQLite store)
+    # Returns one value: None if successful and string message to user if error encountered
+    def save_codes(self):
+        if self.store == None: return self.save_codes_to_excel()
+
+        codes = list(self.df_pdf_import_codes["Codes"])
+        if "Source" in self.df_pdf_import_codes: sources = list(self.df_pdf_import_codes["Source"])
+        else: sources = [""] * len(codes)
+        descriptions = [get_code_descriptions().describe(code) for code in codes]
+        try:
+            self.store.replace_rows([code, "", "", "", "", "", source, description] for code, source, description in zip(codes, sources, descriptions))
+            self.store.set_info("excel_file_key", self.excel_file_key(log_missing = False)) # Earlier edits in the Excel file are replaced, not imported
+        except Exception as save_to_store_e:
+            self.error_logger.log_error("Attempted to save imported codes to the working store", save_to_store_e)
+            return self.store_errmsg
+
+    # Reads the codes from the working store (the Excel file or the SQLite store) into self.df_excel_import_codes and self.header_list
+    # Returns one value: None if successful and string message to user if error encountered
+    def read_codes(self):
+        if self.store == None: return self.read_codes_from_excel()
+
+        self.read_cache_key = None # self.df_excel_import_codes no longer holds the Excel file's contents
+        try:
+            self.header_list = self.store_headers()
+            rows = [row[:7] for row in self.store.rows()]
+            self.df_excel_import_codes = pd.DataFrame(rows, columns = self.header_list, dtype = object)
+        except Exception as read_store_e:
+            self.error_logger.log_error("Attempted to read codes from the working store", read_store_e)
+            return self.store_errmsg
+
+    # Headers of the codes table (the template's, A:F) and the Source column
+    def store_headers(self):
+        headers = self.store.get_info("headers")
+        if headers == None:
+            headers = [cell.value for cell in self.load_template()[1][:6]] + [self.source_header]
+            self.store.set_info("headers", headers)
+        return headers
+
+    # True if the Excel file has been changed since codes were last exported to it from the SQLite store (edits not imported yet)
+    def excel_has_edits(self):
+        if self.store == None or not os.path.isfile(self.excel_file_path): return False
+        return self.excel_file_key(log_missing = False) != self.store.get_info("excel_file_key")
+
+    # Writes the codes in the SQLite store to the Excel file, so they can be edited in Excel
+    # Returns one value: None if successful and string message to user if error encountered
+    def export_store_to_excel(self):
+        try: rows = self.store.rows()
+        except Exception as read_store_e:
+            self.error_logger.log_error("Attempted to read codes from the working store to export them to Excel", read_store_e)
+            return self.store_errmsg
+
+        # Column A:F values, the Source column and the Description column. Blank cells are left empty.
+        columns = {column + 1: [row[column] or None for row in rows] for column in range(6)}
+        headers = {}
+        for column, store_column, header in ((self.source_col, 6, self.source_header), (self.desc_col, 7, self.desc_header)):
+            values = [row[store_column] or None for row in rows]
+            if any(values):
+                columns[column_index_from_string(column)] = values
+                headers[column_index_from_string(column)] = header
+
+        response = self.write_excel(columns, headers)
+        if response == None: self.store.set_info("excel_file_key", self.excel_file_key(log_missing = False))
+        return response
+
+    # Replaces the codes in the SQLite store with the Excel file's (the user's edits)
+    # Returns one value: None if successful and string message to user if error encountered
+    def import_excel_to_store(self):
+        response = self.read_codes_from_excel()
+        if response != None: return response
+
+        try:
+            code_descriptions = get_code_descriptions()
+            rows = self.df_excel_import_codes.values.tolist()
+            self.store.replace_rows(row + [code_descriptions.describe(row[0]) if row[0] != "" else ""] for row in rows)
+            self.store.set_info("excel_file_key", self.read_cache_key)
+        except Exception as import_to_store_e:
+            self.error_logger.log_error("Attempted to import codes from Excel into the working store", import_to_store_e)
+            return self.store_errmsg
 
     # Saves codes found from PDF to Excel
     def save_codes_to_excel(self):
+        codes = list(self.df_pdf_import_codes["Codes"])
+        columns = {1: codes} # {column number: values}
+        headers = {} # {column number: header}
+        # Where each code was found and its description go next to the table
+        if "Source" in self.df_pdf_import_codes:
+            columns[column_index_from_string(self.source_col)] = list(self.df_pdf_import_codes["Source"])
+            headers[column_index_from_string(self.source_col)] = self.source_header
+        code_descriptions = get_code_descriptions()
+        if code_descriptions.available: # Only if the local description store has been built
+            columns[column_index_from_string(self.desc_col)] = [code_descriptions.describe(code) for code in codes]
+            headers[column_index_from_string(self.desc_col)] = self.desc_header
+        return self.write_excel(columns, headers)
+
+    # Writes columns of values ({column number: values}, all the same length) and headers ({column number: header}) to the Excel file
+    # The template stays parsed in memory for the session. Each save puts back the template values of the cells the last save changed,
+    # writes all rows in one pass and saves to a temporary file that then replaces the Excel file in one step.
+    # If anything fails, the previous Excel file is left as it was (never deleted or half-written).
+    # Returns one value: None if successful and string message to user if error encountered
+    def write_excel(self, columns: dict, headers: dict):
         # Error message to the user if the Excel file appears to be open
         save_codes_err_msg = "Failed to save imported codes to Excel file.\n\nPlease close the Excel file if it is open."
 
-        if os.path.isfile(self.excel_file_path): # If file doesn't exist for some reason, don't try to delete it
-            try: os.remove(self.excel_file_path)
-            except Exception as remove_file_e:
-                self.error_logger.log_error("Attempted to remove Excel file before copying template over", remove_file_e)
-                return save_codes_err_msg
-
-        try: sh.copy(self.template_file_path, self.excel_file_path)
-        except PermissionError: return save_codes_err_msg
-        except Exception as copy_file_e:
-            self.error_logger.log_error(
-                "Attempted to copy template file to be new Excel file for CM use. Not a PermissionError.",
-                copy_file_e
-            )
-            return save_codes_err_msg
+        try: ws = self.load_template()
+        except Exception as load_template_e:
+            self.error_logger.log_error("Attempted to load template file to write imported codes to", load_template_e)
+            return "Failed to read the Excel template file.\n\n" \
+                   "You may need to replace the CM_TEMPLATE_CM_Codes.xlsx file with the original template file."
 
-        # Loads workbook and relevant sheet name
-        wb = op.load_workbook(self.excel_file_path)
-        ws = wb[self.excel_file_sheet_name]
+        self.read_cache_key = None # The file is about to change, even if its mtime and size might not show it
 
-        # Writes the data to the table
-        for i, code in enumerate(self.df_pdf_import_codes["Codes"]):
-            ws["A" + str((i + self.excel_data_first_row))].value = code
-        try: wb.save(self.excel_file_path)
-        except PermissionError as save_to_excel_e:
+        # Back to a clean template
+        for (row, column), value in self.template_values.items(): ws.cell(row, column).value = value
+        self.template_values = {}
+
+        for column, header in headers.items(): self.write_cell(ws.cell(1, column), header)
+
+        # Writes all rows in one pass
+        num_rows = len(columns[1])
+        if num_rows != 0:
+            for i, row in enumerate(ws.iter_rows(
+                    min_row = self.excel_data_first_row,
+                    max_row = self.excel_data_first_row + num_rows - 1,
+                    max_col = max(columns)
+            )):
+                for column, values in columns.items(): self.write_cell(row[column - 1], values[i])
+
+        temp_file_path = self.excel_file_path + ".tmp"
+        try:
+            self.template_wb.save(temp_file_path)
+            os.replace(temp_file_path, self.excel_file_path) # Fails (PermissionError) if the Excel file is open
+        except Exception as save_to_excel_e:
             self.error_logger.log_error("Attempting to save imported data to Excel files.", save_to_excel_e)
+            try: os.remove(temp_file_path)
+            except OSError: pass
             return save_codes_err_msg
 
+    # Returns the template's codes worksheet, parsing the template file the first time
+    def load_template(self):
+        if self.template_wb == None: self.template_wb = op.load_workbook(self.template_file_path)
+        return self.template_wb[self.excel_file_sheet_name]
+
+    # Sets a cell of the in-memory template, remembering its template value so the next save can put it back
+    def write_cell(self, cell, value):
+        self.template_values.setdefault((cell.row, cell.column), cell.value)
+        cell.value = value
+
     # Returns one value: None if successful and string message to user if error encountered
+    # Reads the headers and rows of the 7 columns (A:G) in one streaming pass (openpyxl read-only mode) into self.df_excel_import_codes.
+    # Every value is a string, as pd.read_excel(converters = str) gave: empty cells are "" and whole numbers have no ".0".
+    # If the file has not changed since the last read, the last read's results are kept and the file is not parsed again.
     def read_codes_from_excel(self):
-        # ------- Getting accurate header list from Excel file -------
-        try:
-            codes_wb = op.load_workbook(self.excel_file_path, data_only = True)
-            codes_ws = codes_wb[self.excel_file_sheet_name]
+        cache_key = self.excel_file_key()
+        if cache_key == None: return self.read_codes_from_excel_errmsg
+        if cache_key == self.read_cache_key:
+            self.read_cache_hits += 1
+            return None
+
+        self.read_cache_key = None
+        try: codes_wb = op.load_workbook(self.excel_file_path, read_only = True, data_only = True)
         except Exception as load_wb_ws_e:
             self.error_logger.log_error("Attempted to load Codes workbook and worksheet with OpenPyxl", load_wb_ws_e)
             return self.read_codes_from_excel_errmsg
 
         try:
-            self.header_list = []
-            # Iterates through 7 columns (A:G) and adds their values to header_list
-            for col in codes_ws.iter_cols(min_row = 1, max_row = 1, max_col = 7):
-                for cell in col: self.header_list.append(cell.value)
-        except Exception as header_setup_e:
-            self.error_logger.log_error("Attempted to set up headers with for loop", header_setup_e)
-            return self.read_codes_from_excel_errmsg # Same erorr message as above is appropriate
-
-        # ------- Reads data and sets in a dataframe using headers just read in -------
-        try:
-            converters_dict = {header_name: str for header_name in self.header_list} # Forces string data type
-            data = pd.read_excel(
-                self.excel_file_path,
-                sheet_name = self.excel_file_sheet_name,
-                converters = converters_dict
-            )
-            self.df_excel_import_codes = pd.DataFrame(data, columns = self.header_list)
-            self.df_excel_import_codes.replace(np.NaN, "", inplace = True) # Gets rid of Excel's empty cells (NaN)
+            rows = codes_wb[self.excel_file_sheet_name].iter_rows(min_row = 1, max_col = 7, values_only = True)
+            self.header_list = list(next(rows, ())) + [None] * 7
+            self.header_list = self.header_list[:7]
+
+            data = []
+            blank_rows = [] # Blank rows since the last row with data. Only kept if more data follows.
+            for row_num, row in enumerate(rows, 2):
+                if row_num < self.excel_data_first_row: continue
+                row = [self.cell_to_str(value) for value in row] + [""] * (7 - len(row))
+                if row == [""] * 7:
+                    blank_rows.append(row)
+                    if len(blank_rows) >= self.max_blank_rows: break
+                    continue
+                data.extend(blank_rows)
+                blank_rows = []
+                data.append(row)
+            self.df_excel_import_codes = pd.DataFrame(data, columns = self.header_list, dtype = object)
+            self.read_cache_key = cache_key
+            self.read_cache_misses += 1
         except Exception as read_full_excel_data_e:
             self.error_logger.log_error("Attempted to load in all data from Excel file before sending to PCC", read_full_excel_data_e)
-            return self.read_codes_from_excel_errmsg
\ No newline at end of file
+            return self.read_codes_from_excel_errmsg
+        finally: codes_wb.close() # Read-only workbooks keep the file open until closed
+
+    # Returns the read cache key of the Excel file as it is now: [path, mtime in ns, size, sheet name]. Returns None if the file can't be found.
+    # (A list so it compares equal to the copy kept in the SQLite store)
+    def excel_file_key(self, log_missing: bool = True):
+        try: file_stat = os.stat(self.excel_file_path)
+        except OSError as stat_excel_e:
+            if log_missing: self.error_logger.log_error("Attempted to check Excel file before reading it", stat_excel_e)
+            return None
+        return [os.path.abspath(self.excel_file_path), file_stat.st_mtime_ns, file_stat.st_size, self.excel_file_sheet_name]
+
+    # True if self.df_excel_import_codes holds the Excel file's current contents (reading it again would not parse the file)
+    def read_cache_is_current(self):
+        return self.read_cache_key != None and self.read_cache_key == self.excel_file_key()
+
+    # Returns a cell value as the string pd.read_excel(converters = str) gave for it
+    @staticmethod
+    def cell_to_str(value):
+        if value == None or value in ERROR_CODES: return "" # Empty or error (#N/A, etc.) cell
+        if isinstance(value, float) and value.is_integer(): return str(int(value))
+        return str(value)
\ No newline at end of file
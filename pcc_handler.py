@@ -6,18 +6,32 @@ if __name__ == "__main__":
 
 import datetime
 import time
-from time import sleep
 from tkinter import messagebox
 import pandas.core.frame
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support import expected_conditions as EC
 import selenium.common # Used for error detection when switching windows within methods
 from WebdriverFramework import WebdriverMain
 from error_logger import ErrorLogger
 from DataValidation import DataValidation
+from code_descriptions import get_code_descriptions
+from code_index import code_index_for_setting
+from code_sets import UnknownCodeSetVersion
+from upload_plan import build_upload_plan
+from event_log import EventLog
 
 class PccHandler:
+    # Longest waits (seconds) on PCC conditions. Each wait ends as soon as its condition is met (see WebdriverMain's WAIT METHODS).
+    page_timeout = 10 # Page (re)loading until the New Diagnosis button can be clicked
+    window_timeout = 5 # New Diagnosis window opening
+    prompt_window_timeout = .2 # Third window (All Diagnoses prompt) opening after a code is entered
+    description_timeout = 3 # PCC filling in a code's description
+    save_timeout = 5 # Saving a code (window closes, PCC shows an error, or an alert opens)
+    alert_timeout = .25 # Alert opening after a click that may cause one
+    window_count_timeout = 5 # Counting windows again after counting failed
+
     def __init__(self,
                  pcc_url: str,
                  admis_date_id: str,
@@ -31,7 +45,9 @@ class PccHandler:
                  log_file_name: str,
                  FID: str,
                  window_x: int,
-                 window_y: int
+                 window_y: int,
+                 code_set_version: str = "auto",
+                 event_log_file: str = ""
                  ):
 
         # Xpaths
@@ -46,9 +62,13 @@ class PccHandler:
         # Classes
         self.DataValidation = DataValidation()
         self.ErrorLogger = ErrorLogger(log_file_name)
+        self.code_descriptions = get_code_descriptions() # Local CMS code store used to reject codes before entering them into PCC
+        self.code_set_version = code_set_version # ICD-10 code set codes are checked against ("auto" = the version PCC uses today)
+        self.event_log = EventLog(event_log_file) # JSON lines with the timing of each upload step ("" = not written)
 
         # Misc assignments
         self.df_excel_import_codes = None # Dataframe of codes from Excel file
+        self.code_rows = [] # CodeRows to enter into PCC, from the upload plan (what the upload loop works on)
         self.pcc_url = pcc_url # URL to log into PCC
         self.admis_date_id = admis_date_id  # ID for admission date link
         self.FID = FID
@@ -72,10 +92,14 @@ class PccHandler:
             suppress_all_msgs = True,
             suppress_confirmation = True,
             window_x = self.window_x,
-            window_y = self.window_y
+            window_y = self.window_y,
+            event_log = self.event_log
         )
-        sleep(2) # New installations can encounter an error
-        self.webdriver.get_url(self.webdriver.main_win_handle, self.pcc_url)
+        # New installations can encounter an error on the first page load (Chrome is still finishing its setup)
+        # The first load is retried every second for up to page_timeout seconds instead of always waiting.
+        retry_until = time.monotonic() + self.page_timeout
+        while self.webdriver.get_url(self.webdriver.main_win_handle, self.pcc_url) == False and time.monotonic() < retry_until:
+            time.sleep(1)
 
     # --------------------- Entering Codes ---------------------
     # Enters all code data into PCC
@@ -84,6 +108,14 @@ class PccHandler:
                          df_excel_import_codes: pandas.core.frame.DataFrame,
                          excel_headings: tuple
                          ):
+        self.failed_to_enter_code = [] # List of codes that failed to enter
+        self.failed_to_enter_other = [] # List of other items that failed to enter
+
+        # Validates the whole table before Chrome is touched, so browser time is only spent on rows that can succeed
+        try: self.code_rows = self.plan_upload(df_excel_import_codes)
+        except UnknownCodeSetVersion as version_e:
+            return f"\n\n{version_e}\n\nPlease correct code_set_version in CM_Settings.csv. No codes were entered into PCC."
+        if self.code_rows == []: return # Nothing that can be entered
 
         # Tests if Chrome is open (user could have opened then closed it)
         # Already tested to see that Chrome was instantiated once.
@@ -138,103 +170,116 @@ class PccHandler:
         self.classif_obj = None # Webdriver object for Classification drop-down
         self.comm_obj = None # Webdrive obejct for Comments field
         self.save_buttons = None # List of webdriver objects for elements with "pccButton saveButtons" ID ([1] is Save and [2] is Save & New)
-        self.failed_to_enter_code = [] # List of codes that failed to enter
-        self.failed_to_enter_other = [] # List of other items that failed to enter
 
-        df_header_list = self.df_excel_import_codes.columns.values
         cons_failed_iter = 0
+        upload_start = time.monotonic()
 
-        # Iterates through all code data
-        for i in range(0, len(self.df_excel_import_codes.index)):
-            # Used in below for col in df_header_list loop to break out of an iteration (but is reset in each outside loop)
-            skip_col_iteration = False
-            current_code = self.df_excel_import_codes.loc[i, df_header_list[0]].strip() # ICD-10 code for this iteration
-            if current_code == "": continue # Skips empty strings
+        # Iterates through all code data (only the rows in the upload plan)
+        # Each step is timed in self.event_log, as is each code as a whole ("code")
+        for i, code_row in enumerate(self.code_rows):
+            current_code = code_row.code # ICD-10 code for this iteration
+            self.event_log.code = current_code
+            code_start = time.monotonic()
 
             # Closes most recently opened window(s) until there is only one window open
             # Effectively resets back to the main PCC page each time
-            if self.reduce_win_to_one() == False:
-                messagebox.showerror(self.fail_to_man_win[0], self.fail_to_man_win[1])
-                for failed_codes in range(i, len(self.df_excel_import_codes.index)): # Logs remaining codes as failed
-                    self.failed_to_enter_code.append(self.df_excel_import_codes.loc[failed_codes, df_header_list[0]].strip())
-                return "\n\nCould not manage Chrome windows, so the PCC import process was terminated.\n\nPlease wait a few seconds and try again."
+            with self.event_log.step("window cleanup") as step:
+                if step.result(self.reduce_win_to_one()) == False:
+                    messagebox.showerror(self.fail_to_man_win[0], self.fail_to_man_win[1])
+                    self.log_remaining_failed(i)
+                    return "\n\nCould not manage Chrome windows, so the PCC import process was terminated.\n\nPlease wait a few seconds and try again."
 
-            if i != 0: sleep(3) # No need to wait on very first iteration
             self.webdriver.driver.switch_to.window(self.webdriver.driver.window_handles[0])
             self.webdriver.main_win_handle = self.webdriver.driver.window_handles[0]
 
-            # Clicks New Diagnosis button
+            # Waits for the main page to be ready (PCC reloads it after each save), clicks New Diagnosis button and waits for its window
+            # If that fails, refreshes the page and tries once more.
             # If software can't find the button twice in a row, terminates iteration, logs all remaining codes as failed, and informs user.
-            click_new_diag = self.webdriver.click_ele(self.webdriver.main_win_handle, new_diag_button, "New Diagnosis button")
-            if click_new_diag == False:
-                self.webdriver.driver.refresh()
-                sleep(.25)
-                click_new_diag = self.webdriver.find_click(self.webdriver.main_win_handle, "xpath", self.new_diag_button_x, "New Diagnosis button")
-                if click_new_diag == False: # Failed to find button
-                    self.failed_to_enter_code.append(current_code)
-                    cons_failed_iter += 1
-                    if cons_failed_iter >= 2: # 2 failed attempts in a row ends entering codes into PCC
-                        for failed_codes in range(i, len(self.df_excel_import_codes.index)): # Logs remaining codes as failed
-                            self.failed_to_enter_code.append(self.df_excel_import_codes.loc[failed_codes, df_header_list[0]].strip())
-                        return "\n\nCould not find the New Diagnosis button, so the PCC import process was terminated.\n\nIs Chrome on the correct webpage?"
-                    continue
+            with self.event_log.step("find New Diagnosis") as step:
+                click_new_diag = self.open_diag_window()
+                if click_new_diag == False:
+                    step.retries = 1
+                    self.webdriver.driver.refresh()
+                    self.webdriver.wait_for_document_ready(self.page_timeout)
+                    click_new_diag = self.open_diag_window()
+                step.result(click_new_diag)
+            if click_new_diag == False: # Failed to find button
+                self.failed_to_enter_code.append(current_code)
+                self.event_log.emit("code", code_start, "failed")
+                cons_failed_iter += 1
+                if cons_failed_iter >= 2: # 2 failed attempts in a row ends entering codes into PCC
+                    self.log_remaining_failed(i)
+                    return "\n\nCould not find the New Diagnosis button, so the PCC import process was terminated.\n\nIs Chrome on the correct webpage?"
+                continue
 
             cons_failed_iter = 0 # If successfully finds button, resets counter of failed attempts
 
-            sleep(.25) # Gives enough time for window to open
             self.get_diag_win() # Properly sets self.diag_win
 
             # Iterates through all details for each code
-            for col in df_header_list:
-                # May be set to skip if code fails to enter (no need to attempt to enter that code's details)
-                if skip_col_iteration == True: break
-                data_value = self.df_excel_import_codes.loc[i, col].strip()
-
-                """ Skip if blank for all except Rank and Classification.
-                    According to Regional Nursing Consultant Amber Baudler, unless otherwise specified,
-                    Rank should be "Other" and Classifiation should always be "Admission". """
-                if data_value == "":
-                    if col == self.excel_headings[2]: data_value = "Other" # Rank
-                    elif col == self.excel_headings[3]: data_value = "Admission" # Classification
-                    else: continue
-
+            # Blank details are skipped. Rank and Classification are never blank (the plan fills in their defaults).
+            for field, data_value in code_row.filled_fields():
                 # According to Regional Nurse Consultant Amber Baudler, always use admit date for the Date field
                 # (though this will enter the current date if there is no admit date in the census line)
-                self.enter_adm_date(current_code)
-
-                if col == self.excel_headings[0]: # 'ICD-10 Code'
-                    if self.enter_diag_code(data_value) == False:
-                        skip_col_iteration = True
-                        continue
-                elif col == self.excel_headings[1]: # "Resolved Date"
-                    self.enter_resolved_date(data_value, current_code)
-                elif col == self.excel_headings[2]: # "Rank"
-                    self.enter_rank(data_value, current_code)
-                elif col == self.excel_headings[3]: # "Classification"
-                    self.enter_classif(current_code)
-                elif col == self.excel_headings[4]: # "Comments"
-                    self.enter_comments(data_value, current_code)
-                elif col == self.excel_headings[5]: # "Confidential?"
-                    self.select_confidential(data_value, current_code)
-
-            self.click_save(current_code)
-
-            sleep(.2)
-
-            # Checks for an error in entering a code (e.g., code already exists for this patient)
-            self.webdriver.driver.switch_to.window(self.webdriver.driver.window_handles[-1])
-            try: self.webdriver.driver.find_element(By.ID, "pccError")
-            except: pass
-            else: self.failed_to_enter_code.append(current_code) # Adds this code to list of failed codes
-
-        self.reduce_win_to_one() # Full import process complete. No need to check if window reduction failed.
+                with self.event_log.step("enter admission date"): self.enter_adm_date(current_code)
+
+                with self.event_log.step(f"enter {field.replace('_', ' ')}") as step:
+                    if field == "code": # 'ICD-10 Code'
+                        if step.result(self.enter_diag_code(data_value)) == False: break # No need to attempt to enter that code's details
+                    elif field == "resolved_date": # "Resolved Date"
+                        self.enter_resolved_date(data_value, current_code)
+                    elif field == "rank": # "Rank"
+                        self.enter_rank(data_value, current_code)
+                    elif field == "classification": # "Classification"
+                        self.enter_classif(data_value, current_code)
+                    elif field == "comments": # "Comments"
+                        self.enter_comments(data_value, current_code)
+                    elif field == "confidential": # "Confidential?"
+                        self.select_confidential(data_value, current_code)
+
+            with self.event_log.step("save") as step:
+                step.result(self.click_save(current_code))
+
+                # Checks for an error in entering a code (e.g., code already exists for this patient)
+                self.webdriver.driver.switch_to.window(self.webdriver.driver.window_handles[-1])
+                try: self.webdriver.driver.find_element(By.ID, "pccError")
+                except: pass
+                else:
+                    self.failed_to_enter_code.append(current_code) # Adds this code to list of failed codes
+                    step.outcome = "failed"
+                    step.details["pcc_error"] = True
+
+            if current_code in self.failed_to_enter_code: self.event_log.emit("code", code_start, "failed")
+            else: self.event_log.emit("code", code_start)
+
+        self.event_log.code = ""
+        with self.event_log.step("window cleanup"): self.reduce_win_to_one() # Full import process complete. No need to check if window reduction failed.
+        self.event_log.emit(
+            "upload",
+            upload_start,
+            codes = len(self.code_rows),
+            failed_codes = len(self.failed_to_enter_code),
+            element_cache_hits = self.webdriver.element_cache_hits,
+            element_cache_misses = self.webdriver.element_cache_misses
+        )
+        self.event_log.flush()
+
+    # Checks the whole codes table before anything is entered into PCC and returns the CodeRows to enter (see upload_plan.py)
+    # PCC only reports an invalid code after it is typed in and its description comes back empty, which costs several seconds of browser time per code.
+    # Rejected codes (invalid, retired) are logged as failed. The reasons, and details that can't be entered, go in failed_to_enter_other.
+    # Raises UnknownCodeSetVersion if self.code_set_version names a version that is not available.
+    def plan_upload(self, df_excel_import_codes: pandas.core.frame.DataFrame):
+        upload_plan = build_upload_plan(df_excel_import_codes, code_index_for_setting(self.code_set_version), self.code_descriptions)
+        self.failed_to_enter_code.extend(upload_plan.rejected_codes)
+        self.failed_to_enter_other.extend(upload_plan.notes)
+        return upload_plan.code_rows
 
     # Enters a diagnosis code
     def enter_diag_code(self, code: str):
         code_field_msg = "Code text box in New Diagnosis window" # Fail message passed to webdriver find_ele method
 
         # if self.code_field_obj == None:
-        self.code_field_obj = self.webdriver.find_ele(self.diagn_win, "xpath", self.code_field_x, code_field_msg)
+        self.code_field_obj = self.webdriver.find_ele(self.diagn_win, "xpath", self.code_field_x, code_field_msg, cache = True)
 
         if self.code_field_obj == False: # Could not find the field at all to begin searching for code
             self.failed_to_enter_code.append(code)
@@ -257,31 +302,28 @@ class PccHandler:
         # This looks for 3 windows, which means either (1) a window has appeared requiring the user to select the All Diagnoses link"
         # (frequently required) or (2) the window is appearing that will have the infinitely loading page with
         # the prompt on it.
-        # The below process runs for 0.2 seconds and rapidly checks for three windows being open at the same time.
+        # The below process waits up to prompt_window_timeout (0.2 seconds), rapidly checking for three windows being open at the same time.
         # If there are three, it attempts to click the All Diagnoses link. If it cannot find the link,
         # presumably the window is about to load infinitely with the prompt on top,
         # and it closes that window before the prompt can even appear.
-        timer_start = time.time()
-        while timer_start + .2 > time.time():
-            num_windows = self.num_windows()
-            if num_windows == False: self.close_most_rec_win()
-            elif self.num_windows() == 3:
-                # Tries to get the All Diagnosis link. If an ICD-10 code is in PCC, this will ensure it is found and assigned
-                # This may fail if PCC is going to display an alert error (which cannot be closed out because the window loads infinitely without manual user input)
-                try:
-                    self.webdriver.driver.switch_to.window(self.webdriver.driver.window_handles[-1]) # Switches to new window
-                    all_diag_link = self.webdriver.driver.find_elements(By.CLASS_NAME, "viewFilter")[0] # Tries to get the link
-                    self.webdriver.click_ele(self.webdriver.driver.window_handles[-1], all_diag_link, "All Diagnoses link") # Tries to click the link
-                except: # Try above failed. Presumably there is no link to click and the window is about to load infinitely.
-                    try: self.webdriver.driver.switch_to.alert.accept() # Attempts to dismiss alert (this has never worked in testing)
-                    except: pass
-                    finally:
-                        num_windows = self.num_windows()
-                        if num_windows == 3 or num_windows == False: self.close_most_rec_win() # Closes out the most recent window.
-                break
+        if self.webdriver.wait_for_window_count(3, self.prompt_window_timeout, "All Diagnoses window") != False:
+            # Tries to get the All Diagnosis link. If an ICD-10 code is in PCC, this will ensure it is found and assigned
+            # This may fail if PCC is going to display an alert error (which cannot be closed out because the window loads infinitely without manual user input)
+            try:
+                self.webdriver.driver.switch_to.window(self.webdriver.driver.window_handles[-1]) # Switches to new window
+                all_diag_link = self.webdriver.driver.find_elements(By.CLASS_NAME, "viewFilter")[0] # Tries to get the link
+                self.webdriver.click_ele(self.webdriver.driver.window_handles[-1], all_diag_link, "All Diagnoses link") # Tries to click the link
+            except: # Try above failed. Presumably there is no link to click and the window is about to load infinitely.
+                try: self.webdriver.driver.switch_to.alert.accept() # Attempts to dismiss alert (this has never worked in testing)
+                except: pass
+                finally:
+                    num_windows = self.num_windows()
+                    if num_windows == 3 or num_windows == False: self.close_most_rec_win() # Closes out the most recent window.
 
         # Obtains PCC-generated code description. Returns False if failed to get code (presumably the window is not open)
-        code_desc = self.get_desc()
+        with self.event_log.step("description wait") as step:
+            code_desc = step.result(self.get_desc())
+            if code_desc == "": step.outcome = "failed" # PCC did not recognize the code
 
         if code_desc == False: # Failed to find description at all. Failed to enter this code.
             self.failed_to_enter_code.append(code)
@@ -295,7 +337,7 @@ class PccHandler:
     def enter_adm_date(self, code: str):
         fail_adate_txt = "Admission date link" # Used if entering this data fails
 
-        self.admission_date_obj = self.webdriver.find_click(self.diagn_win, "id", self.admis_date_id, fail_adate_txt)
+        self.admission_date_obj = self.webdriver.find_click(self.diagn_win, "id", self.admis_date_id, fail_adate_txt, cache = True)
         if self.admission_date_obj == False:
             print(f"Failed to find {fail_adate_txt}")
             self.fail_other_log(code, "Admission date", "Date field")
@@ -304,6 +346,13 @@ class PccHandler:
         # If an alert appears, this dismisses it
         self.dismiss_alert()
 
+    # Clicks New Diagnosis button once the main page is ready, then waits for the New Diagnosis window. Returns False if either fails.
+    def open_diag_window(self):
+        new_diag_button = self.webdriver.wait_for_element("xpath", self.new_diag_button_x, self.page_timeout, "New Diagnosis button", clickable = True)
+        if new_diag_button == False: return False
+        if self.webdriver.click_ele(self.webdriver.main_win_handle, new_diag_button, "New Diagnosis button") == False: return False
+        return self.webdriver.wait_for_window_count(2, self.window_timeout, "New Diagnosis window")
+
     # Fills in the Resolved Date field
     def enter_resolved_date(self, date: str, code: str):
         fail_rdate_txt = "Resolved Date field" # Used if entering this data fails
@@ -350,7 +399,7 @@ class PccHandler:
     def enter_rank(self, rank: str, code: str):
         fail_rank_txt = "Rank drop-down menu" # Used if entering this data fails
 
-        self.rank_obj = self.webdriver.find_ele(self.diagn_win, "xpath", self.rank_x, fail_rank_txt)
+        self.rank_obj = self.webdriver.find_ele(self.diagn_win, "xpath", self.rank_x, fail_rank_txt, cache = True)
         if self.rank_obj == False:
             self.fail_other_log(code, rank, fail_rank_txt)
             return
@@ -361,24 +410,24 @@ class PccHandler:
 
     # Enter Classification
     # Per Regional Nurse Consultant Amber Baudler, software will always select Admission (unless otherwise specified)
-    def enter_classif(self, code: str):
+    def enter_classif(self, classification: str, code: str):
         fail_classif_txt = "Classification drop-down" # Used if entering this data fails
 
-        self.classif_obj = self.webdriver.find_ele(self.diagn_win, "xpath", self.clasif_x, fail_classif_txt)
+        self.classif_obj = self.webdriver.find_ele(self.diagn_win, "xpath", self.clasif_x, fail_classif_txt, cache = True)
         if self.classif_obj == False:
             print(f"Failed to find {fail_classif_txt}")
-            self.fail_other_log(code, "Admission", fail_classif_txt)
+            self.fail_other_log(code, classification, fail_classif_txt)
             return
 
-        # Attempts to enter "Admission" as selection
-        if self.webdriver.enter_text_ele(self.diagn_win, self.classif_obj, "Admission", fail_classif_txt) == False:
-            self.fail_other_log(code, "Admission", fail_classif_txt)
+        # Attempts to enter the classification as selection
+        if self.webdriver.enter_text_ele(self.diagn_win, self.classif_obj, classification, fail_classif_txt) == False:
+            self.fail_other_log(code, classification, fail_classif_txt)
 
     # Enters comments
     def enter_comments(self, comment: str, code: str):
         fail_comm_txt = "Comments field" # Used if entering this data fails
 
-        self.comm_obj = self.webdriver.find_ele(self.diagn_win, "xpath", self.comm_x, fail_comm_txt)
+        self.comm_obj = self.webdriver.find_ele(self.diagn_win, "xpath", self.comm_x, fail_comm_txt, cache = True)
         if self.comm_obj == False:
             print(f"Failed to find {fail_comm_txt}")
             self.fail_other_log(code, comment, fail_comm_txt)
@@ -392,17 +441,19 @@ class PccHandler:
     def select_confidential(self, data_value: str, code: str):
         if data_value[0].lower() != "y": return # Anything but a "yes" is returned. Already ensured len() > 0.
 
-        if self.webdriver.find_click(self.diagn_win, "xpath", self.confid_x, "Confidential checkbox") == False:
+        if self.webdriver.find_click(self.diagn_win, "xpath", self.confid_x, "Confidential checkbox", cache = True) == False:
             self.fail_other_log(code, "check", "'Confidential' checkbox")
 
-    # Tries to get text from description field. Returns text found or False if fails.
+    # Tries to get text from description field once PCC fills it in. Returns text found, "" if PCC never filled it in, or False if fails.
     def get_desc(self):
-        sleep(.5)
         try: self.webdriver.driver.switch_to.window(self.diagn_win)
         except: return False # self.diagn_win must be closed
+        # Not cached, and found again on every check while waiting: PCC may re-render the field when it looks up the code
         code_desc = self.webdriver.find_ele(self.diagn_win, "xpath", self.code_desc_x, "Code Description")
         if code_desc == False: return False
-        return code_desc.get_attribute("value")
+        description = self.webdriver.wait_for_value("xpath", self.code_desc_x, self.description_timeout, "Code Description")
+        if description == False: return ""
+        return description
 
     # Click Save
     def click_save(self, code: str):
@@ -420,24 +471,32 @@ class PccHandler:
             self.failed_to_enter_code.append(code)
             return False
         else:
-            sleep(.5)
-            # If an alert appears, this dismisses it
-            self.dismiss_alert()
+            # Waits for the save to go through, then dismisses the alert if one appeared
+            self.webdriver.wait_until(lambda driver: self.save_finished(driver, num_wins), self.save_timeout, "save")
+            self.dismiss_alert(timeout = 0)
             return
 
+    # True once a save has gone through: the New Diagnosis window closed, PCC showed an error in it, or an alert opened
+    def save_finished(self, driver, num_wins: int):
+        if EC.alert_is_present()(driver) != False: return True
+        if len(driver.window_handles) < num_wins: return True
+        return driver.find_elements(By.ID, "pccError") != []
+
     # --------------------- Window Management ---------------------
     # Returns number of windows
     def num_windows(self):
         # Attempts to catch a failure to count windows. Could happen if too many attempts to count have been made quickly.
         try: return len(self.webdriver.driver.window_handles)
         except:
-            sleep(5) # Waits and tries again (usually this will correct problem, since it arises from too many counts too quickly)
-            try: return len(self.webdriver.driver.window_handles)
+            # Waits and tries again, every half second (usually this will correct problem, since it arises from too many counts too quickly)
+            # The count is returned in a tuple so a count of 0 is still a result (0 on its own would count as "not yet")
+            counted = self.webdriver.wait_until(lambda driver: (len(driver.window_handles),), self.window_count_timeout, "window count", poll_interval = .5)
             # Still can't get window count even after waiting. Logs error and terminates import process.
             # Method that called this informs user and if relevant, logs all future codes as failed.
-            except Exception as count_windows_e:
-                self.ErrorLogger.log_error("Attempted to count windows with len(self.webdriver.window_handles) in num_windows()", count_windows_e)
+            if counted is False:
+                self.ErrorLogger.log_error("Attempted to count windows with len(self.webdriver.window_handles) in num_windows()", f"No window count after {self.window_count_timeout} seconds")
                 return False
+            return counted[0]
 
     # Gets the most recently opened window (called when the new diagnosis window is needed)
     def get_diag_win(self):
@@ -455,9 +514,11 @@ class PccHandler:
             self.ErrorLogger.log_error("Attempted to check main_win_handle against window_handles[-1] and attempted to count windows with num_windows()", identify_window_handles_e)
             return False
         try:
-            self.webdriver.driver.switch_to.window(self.webdriver.driver.window_handles[-1])
+            closing_handle = self.webdriver.driver.window_handles[-1]
+            self.webdriver.driver.switch_to.window(closing_handle)
             self.webdriver.driver.close()
         except: return False
+        self.webdriver.forget_window(closing_handle) # Its cached elements are gone with it
 
     # Reduces windows to one (keeps self.webdriver.main_win_handle)
     def reduce_win_to_one(self):
@@ -470,11 +531,14 @@ class PccHandler:
                 except Exception as close_most_rec_e:
                     self.ErrorLogger.log_error("Attempted to close most recent window with close_most_rec_win()", close_most_rec_e)
                     break
-
-    # Attempts to dismiss alert. No need to log error; try will fail if there was no alert in the first place.
-    def dismiss_alert(self):
-        sleep(.25)
-        try: self.webdriver.driver.switch_to.alert.accept()
+        self.webdriver.prune_element_cache() # Also drops windows PCC closed itself (the New Diagnosis window closes on save)
+
+    # Attempts to dismiss alert, waiting up to timeout seconds (default alert_timeout) for one to open. No need to log error if there is none.
+    def dismiss_alert(self, timeout: float = None):
+        if timeout == None: timeout = self.alert_timeout
+        alert = self.webdriver.wait_for_alert(timeout)
+        if alert == False: return
+        try: alert.accept()
         except: pass
 
     # --------------------- Miscellaneous ---------------------
@@ -483,6 +547,10 @@ class PccHandler:
             messagebox.showerror("Unlicensed facility", self.fail_to_verify)
             return False
 
+    # Logs the codes of row first_row and every row after it as failed (the upload was stopped)
+    def log_remaining_failed(self, first_row: int):
+        for code_row in self.code_rows[first_row:]: self.failed_to_enter_code.append(code_row.code)
+
     # Simple method keeping records of failing to enter data consistent
     def fail_other_log(self, code: str, element: str, field: str):
         self.failed_to_enter_other.append(f"{code} -- Failed to enter {element} in {field}")
\ No newline at end of file
@@ -4,76 +4,469 @@ if __name__ == "__main__":
     print("This is not the main module. Do not execute directly.")
     sys.exit()
 
-import re
+import os, importlib.util
 from os import path
-from PyPDF2 import PdfFileReader
-from full_codes import codes_list
+from io import StringIO
+from collections import namedtuple, deque
+from concurrent.futures import ProcessPoolExecutor
+from code_index import get_code_index, code_index_for_setting
+from code_sets import UnknownCodeSetVersion
+from code_extractor import CodeExtractor
+from extraction_cache import ExtractionCache
+from section_finder import SectionFinder
+from document_adapters import adapter_for
+
+# One scanned page yielded by PdfProcessing.stream_pdf()
+# page_num is 1-based. num_pages is None for documents other than PDFs (see document_adapters.py). new_codes are the valid codes on this page that were not found on any earlier page.
+PageScan = namedtuple("PageScan", ["page_num", "num_pages", "text", "new_codes"])
+
+# ------------------ Text extraction backends ------------------
+# Each backend opens one PDF with a different library and has num_pages and iter_text(start, stop).
+# Libraries are only imported when a backend is used, so only the selected backend (pdf_backend setting) has to be installed.
+# "python benchmarks.py backends <PDFs>" checks that every installed backend finds the same codes and saves the fastest to the settings.
+
+# PyPDF2 (original backend)
+class PyPDF2Backend:
+    name = "PyPDF2"
+    module = "PyPDF2"
+
+    def __init__(self, pdf_path: str):
+        try: from PyPDF2 import PdfReader
+        except ImportError: from PyPDF2 import PdfFileReader as PdfReader # Older PyPDF2
+        self.pdf_reader = PdfReader(pdf_path)
+        self.num_pages = len(self.pdf_reader.pages)
+
+    # Generator that yields the text of pages start to stop - 1
+    def iter_text(self, start: int, stop: int):
+        for page in range(start, stop): yield self.pdf_reader.pages[page].extract_text()
+
+    # True if the backend's library is installed
+    @classmethod
+    def installed(cls): return importlib.util.find_spec(cls.module) != None
+
+# pypdf (maintained successor of PyPDF2, faster text extraction)
+class PypdfBackend(PyPDF2Backend):
+    name = "pypdf"
+    module = "pypdf"
+
+    def __init__(self, pdf_path: str):
+        from pypdf import PdfReader
+        self.pdf_reader = PdfReader(pdf_path)
+        self.num_pages = len(self.pdf_reader.pages)
+
+# pdfminer.six. Layout analysis (LAParams) is needed: without it, text runs are joined with no spaces or line breaks between them,
+# so a code can run into the next word and be missed.
+class PdfminerBackend(PyPDF2Backend):
+    name = "pdfminer"
+    module = "pdfminer"
+
+    def __init__(self, pdf_path: str):
+        from pdfminer.pdfparser import PDFParser
+        from pdfminer.pdfdocument import PDFDocument
+        from pdfminer.pdftypes import resolve1
+        self.pdf_path = pdf_path
+        with open(pdf_path, "rb") as pdf_file:
+            self.num_pages = resolve1(PDFDocument(PDFParser(pdf_file)).catalog["Pages"])["Count"]
+
+    def iter_text(self, start: int, stop: int):
+        if start >= stop: return # pdfminer reads an empty pagenos as "all pages"
+        from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+        from pdfminer.converter import TextConverter
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfpage import PDFPage
+
+        resource_manager = PDFResourceManager()
+        with open(self.pdf_path, "rb") as pdf_file:
+            for page in PDFPage.get_pages(pdf_file, pagenos = set(range(start, stop))):
+                page_text = StringIO()
+                converter = TextConverter(resource_manager, page_text, laparams = LAParams())
+                PDFPageInterpreter(resource_manager, converter).process_page(page)
+                converter.close()
+                yield page_text.getvalue()
+
+pdf_backends = {backend.name: backend for backend in (PyPDF2Backend, PypdfBackend, PdfminerBackend)}
+
+# Returns the names of the backends whose libraries are installed
+def installed_backends(): return [name for name, backend in pdf_backends.items() if backend.installed()]
+
+# Process pool worker for parallel text extraction. Opens the PDF itself and returns the text of pages start to stop - 1, in page order.
+# Must stay at module level so it can be pickled and sent to worker processes.
+def extract_page_range(pdf_path: str, start: int, stop: int, backend_name: str = "PyPDF2"):
+    return list(pdf_backends[backend_name](pdf_path).iter_text(start, stop))
 
 # Imports PDFs and extracts ICD-10 codes from them
 class PdfProcessing:
-    def __init__(self):
-        self.pdf_reader = None # Will be used for PyPDF2.PdfFileReader()
+    # PDFs with fewer pages than this are always extracted serially. Starting worker processes costs more than it saves on small files.
+    parallel_min_pages = 20
+
+    # pdf_workers: number of worker processes used to extract text from large PDFs. 1 = no parallel extraction. 0 = one per CPU core.
+    # cache_dir/cache_max_mb: where and how much extraction results are cached so re-imported PDFs are not parsed again. 0 MB = no cache.
+    # code_set_version: ICD-10 code set codes are validated against. "auto" = the version PCC uses on the day of the import.
+    # skip_repeats: "off", "pages" or "lines" (see CodeExtractor). Repeated text is only scanned once; results are the same either way,
+    # so it is not part of the cache key. Any other value is treated as "off".
+    # pdf_backend: name of the text extraction backend (see pdf_backends)
+    # targeted_sections: True = codes are only taken from Diagnoses, Problem List, Assessment/Plan, etc. sections (see SectionFinder)
+    # page_limits: pages to import, e.g., "first 20; last 20" or "1-5; 30; last 10" (see self.parse_page_limits()). "all" = every page.
+    # An invalid page_limits is treated as "all" and the error is kept in self.page_limits_error so it can be reported.
+    def __init__(self, pdf_workers: int = 1, cache_dir: str = "", cache_max_mb: int = 0, code_set_version: str = "auto",
+                 skip_repeats: str = "off", pdf_backend: str = "PyPDF2", targeted_sections: bool = False, page_limits: str = "all"):
+        self.pdf_workers = pdf_workers
+        self.pdf_backend = pdf_backend
+        self.section_finder = None # SectionFinder, if targeted mode is turned on
+        if targeted_sections: self.section_finder = SectionFinder()
+        self.page_limits_error = None # ValueError raised by an invalid page_limits (every page is then imported)
+        try: self.page_limits = self.parse_page_limits(page_limits)
+        except ValueError as e:
+            self.page_limits = []
+            self.page_limits_error = e
+        if skip_repeats not in CodeExtractor.skip_repeats_options: skip_repeats = "off"
+        self.code_set_version = code_set_version
+        self.extraction_cache = None # ExtractionCache, if caching is turned on
+        if cache_dir != "" and cache_max_mb > 0: self.extraction_cache = ExtractionCache(cache_dir, cache_max_mb * 1024 * 1024)
+        self.cache_hits = 0 # PDFs this session that were loaded from the cache
+        self.cache_misses = 0 # PDFs this session that had to be parsed (and were then cached)
+        self.parallel_error = None # Exception that stopped the most recent parallel extraction (extraction then finished serially)
+        self.code_sources = {} # Codes from the most recent batch import with the files and pages they were found in
+        self.batch_errors = [] # Files from the most recent batch import that could not be imported
+        self.pdf_reader = None # Backend object (see pdf_backends) of the PDF being scanned
         self.pdf_all_text = [] # List of all text extracted from PDF (page text = liste ele)
         self.regex_results = [] # List of regex results from the entire PDF document
+        self.code_index = get_code_index() # Hashed index of all valid ICD-10 codes. Replaced by self.select_code_set() before each import.
+        self.code_extractor = CodeExtractor(self.code_index, skip_repeats) # Finds and dedupes codes in page text
+        self.skipped_bytes = 0 # Bytes of repeated text the most recent import did not need to scan
+        self.page_hits = [] # Number of valid code matches on each page of the most recent document
 
     # Returns a three-item tuple
     # tup[0] = either a list of all pages' text OR False if an error occurred
     # tup[1] = either None (successful text extraction) OR a string message to user about error
     # tup[2] = either None (successful text extraction or invalid PDF or no text in PDF) OR exception captured by try/except
+    # Thin wrapper around self.stream_pdf() for callers that want all pages' text at once. Codes are also left in self.regex_results.
     def import_pdf(self, pdf_path: str):
-        self.pdf_all_text = [] # List of lists of codes. Each sub-list is from one page.
+        self.pdf_all_text = [] # List of all pages' text
+
+        try:
+            for page_scan in self.stream_pdf(pdf_path): self.pdf_all_text.append(page_scan.text)
+        except PdfImportError as import_pdf_e: return (False, import_pdf_e.user_msg, import_pdf_e.exception)
+
+        return (self.pdf_all_text, None, None)
+
+    # Generator that extracts and scans the PDF one page at a time, yielding a PageScan for each page
+    # Nothing keeps a page's text once it has been scanned and yielded, so memory use does not grow with the number of pages.
+    # Codes found so far are available in self.code_extractor.codes at any point.
+    # Raises PdfImportError (with a message for the user) if the PDF cannot be read or has no text.
+    def stream_pdf(self, pdf_path: str):
+        self.parallel_error = None
+        self.skipped_bytes = 0
+        self.select_code_set()
+        yield from self.scan_pdf(pdf_path)
+
+    # Generator that imports several PDFs at once, yielding (pdf_path, PageScan) for every page of every file, one file after another
+    # With more than one worker, every file's page ranges are submitted to one process pool up front. All files are extracted at the
+    # same time, so the total time is close to the time for the largest file rather than the sum of all files.
+    # Codes are merged across files into self.code_sources, {code: [(file name, first page in that file), ...]}, in the order first found.
+    # Codes are keyed in dotted form (see CodeIndex.dotted()), so "E11.9" in one file and "E119" in another are the same code.
+    # Files that cannot be imported are skipped and recorded in self.batch_errors as (pdf_path, PdfImportError).
+    def stream_batch(self, pdf_paths: list):
+        self.parallel_error = None
+        self.code_sources = {}
+        self.batch_errors = []
+        self.skipped_bytes = 0
+        try: self.select_code_set()
+        except PdfImportError as version_e: # No file can be scanned without a code set
+            self.batch_errors = [(pdf_path, version_e) for pdf_path in pdf_paths]
+            return
+        num_workers = self.num_workers()
+        executor = None
+        file_futures = {} # Futures of each file's page ranges
+
+        # Cache keys are worked out first so files already in the cache are not sent to the process pool
+        cache_keys = {}
+        if self.extraction_cache != None:
+            for pdf_path in pdf_paths:
+                try: cache_keys[pdf_path] = self.cache_key(pdf_path)
+                except PdfImportError: pass # Reported by self.scan_pdf() when the file is reached
+
+        if num_workers > 1:
+            # Counts pages first so the pool is only started if there is enough work to be worth it
+            file_pages = {}
+            for pdf_path in pdf_paths:
+                if pdf_path in cache_keys and cache_keys[pdf_path] in self.extraction_cache: continue
+                if adapter_for(pdf_path) != None: continue # Other documents are read serially
+                try: file_pages[pdf_path] = self.select_pages(self.open_pdf(pdf_path).num_pages)
+                except PdfImportError: pass # Reported by self.scan_pdf() when the file is reached
+
+            if sum(len(pages) for pages in file_pages.values()) >= self.parallel_min_pages:
+                executor = ProcessPoolExecutor(max_workers = num_workers)
+                for pdf_path, pages in file_pages.items():
+                    if pages == []: continue # Reported by self.scan_pdf() when the file is reached
+                    file_futures[pdf_path] = self.submit_page_ranges(executor, pdf_path, pages, num_workers)
+
+        try:
+            for pdf_path in pdf_paths:
+                file_name = path.basename(pdf_path)
+                file_codes = set() # Dotted codes already found in this file (a code can be written more than one way)
+                try:
+                    for page_scan in self.scan_pdf(pdf_path, file_futures.pop(pdf_path, None), cache_keys.get(pdf_path)):
+                        # new_codes are the codes first found on this page of this file (self.scan_pdf() resets for each file)
+                        for code in page_scan.new_codes:
+                            code = self.code_index.dotted(code) or code
+                            if code in file_codes: continue
+                            file_codes.add(code)
+                            self.code_sources.setdefault(code, []).append((file_name, page_scan.page_num))
+                        yield pdf_path, page_scan
+                except PdfImportError as import_pdf_e: self.batch_errors.append((pdf_path, import_pdf_e))
+        finally:
+            if executor != None: executor.shutdown(wait = False, cancel_futures = True)
+
+        self.regex_results = list(self.code_sources)
+
+    # Generator that does the work for self.stream_pdf() and self.stream_batch()
+    # futures: page ranges already submitted to a process pool by self.stream_batch(). None = this method decides how to extract.
+    # cache_key: the PDF's cache key if self.stream_batch() already worked it out
+    def scan_pdf(self, pdf_path: str, futures: deque = None, cache_key: str = None):
+        self.code_extractor.reset()
+        self.regex_results = []
+        self.page_hits = self.code_extractor.page_hits
+
+        # Replays the results of an earlier import of the same PDF
+        if self.extraction_cache != None:
+            if cache_key == None: cache_key = self.cache_key(pdf_path)
+            if cache_key in self.extraction_cache:
+                self.cache_hits += 1
+                yield from self.scan_cached(cache_key)
+                return
+            self.cache_misses += 1
+
+        self.pdf_reader = self.open_pdf(pdf_path)
+        num_pages = self.pdf_reader.num_pages
+
+        # Zero pages found in file. May be corrupt or not a PDF
+        if num_pages == 0: raise PdfImportError("No pages were found in this file.\n\nIs this a valid PDF file?")
+
+        # Each page is added to the cache as it is scanned. The entry is only kept if the whole PDF is scanned successfully.
+        cache_writer = None
+        if cache_key != None: cache_writer = self.extraction_cache.open_writer(cache_key, num_pages)
+
+        # Extracts and scans each selected page's text
+        # Other documents (see document_adapters.py) have no page count up front. All their pages are read in order.
+        if num_pages == None: pages = enumerate(self.pdf_reader.iter_pages())
+        else: pages = self.iter_page_text(pdf_path, self.select_pages(num_pages), futures)
+        pages = self.guard_pages(pages)
+        found_text = False
+        if self.section_finder != None: self.section_finder.reset()
+        try:
+            for page, page_text in pages:
+                if page_text != "": found_text = True
+                new_codes = self.code_extractor.scan_page(self.target_text(page_text))
+                if cache_writer != None: cache_writer.add_page(page + 1, page_text, new_codes, self.code_extractor.page_hits[-1])
+                yield PageScan(page + 1, num_pages, page_text, new_codes)
+
+            if cache_writer != None and found_text: cache_writer.commit()
+        finally:
+            if cache_writer != None: cache_writer.discard() # No effect if already committed
+            self.skipped_bytes += self.code_extractor.skipped_bytes
+
+        self.regex_results = self.code_extractor.codes
+
+        # No page had any text
+        if found_text == False:
+            raise PdfImportError("No text found in document.\n\nDoes this PDF have text in it? Is it a scan or a fax?")
+
+    # Generator that passes pages through, raising PdfImportError for any error while reading them
+    # Files are only checked when they are opened, so a damaged part further in (truncated XML, a bad zip entry, a page the backend
+    # cannot parse) only shows up here. Errors while scanning a page's text are not caught.
+    @staticmethod
+    def guard_pages(pages):
+        pages = iter(pages)
+        while True:
+            try: page = next(pages)
+            except StopIteration: return
+            except Exception as read_page_e:
+                raise PdfImportError("Part of this file could not be read.\n\nIs the file damaged or incomplete?", read_page_e)
+            yield page
+
+    # Generator that yields a PageScan for each page of a cached import
+    # A cache entry that cannot be read is deleted so the next import of the PDF parses it again.
+    def scan_cached(self, cache_key: str):
+        try:
+            for num_pages, page_num, page_text, new_codes, hits in self.extraction_cache.read_pages(cache_key):
+                self.code_extractor.add_codes(new_codes)
+                self.code_extractor.page_hits.append(hits)
+                yield PageScan(page_num, num_pages, page_text, new_codes)
+        except Exception as read_cache_e:
+            self.extraction_cache.remove(cache_key)
+            raise PdfImportError(
+                "The saved results of an earlier import of this PDF could not be read.\n\nPlease import the PDF again.",
+                read_cache_e
+            )
+
+        self.regex_results = self.code_extractor.codes
+
+    # Opens a PDF with the selected backend, or another document (TXT, DOCX, C-CDA XML) with its adapter (see document_adapters.py)
+    # Raises PdfImportError if the backend is not installed or the file cannot be read.
+    def open_pdf(self, pdf_path: str):
+        adapter = adapter_for(pdf_path)
+        if adapter != None:
+            try: return adapter(pdf_path)
+            except Exception as read_doc_e:
+                raise PdfImportError("File could not be read.\n\nIs this a valid file, or was the file removed?", read_doc_e)
+
+        backend = pdf_backends.get(self.pdf_backend)
+        if backend == None or not backend.installed():
+            raise PdfImportError(
+                f"The PDF reader \"{self.pdf_backend}\" (pdf_backend in CM_Settings.csv) is not installed.\n\n"
+                    f"Installed PDF readers: {', '.join(installed_backends()) or 'none'}"
+            )
 
         # Checking for any unlikely problems reading the file
         # This catches invalid PDFs and should catch removed files
-        try: self.pdf_reader = PdfFileReader(pdf_path)
+        try: return backend(pdf_path)
         except Exception as read_pdf_e:
-            return (False,
-                    "PDF file could not be read.\n\nIs this a valid PDF, or was the file removed?",
-                    read_pdf_e
-                    )
+            raise PdfImportError(
+                "PDF file could not be read.\n\nIs this a valid PDF, or was the file removed?",
+                read_pdf_e
+            )
 
-        num_pages = self.pdf_reader.getNumPages()
+    # Returns the PDF's key in the extraction cache. Raises PdfImportError if the file cannot be read.
+    def cache_key(self, pdf_path: str):
+        try: return self.extraction_cache.key_for(pdf_path, self.scan_signature())
+        except OSError as read_pdf_e:
+            raise PdfImportError(
+                "File could not be read.\n\nWas the file removed or renamed?",
+                read_pdf_e
+            )
 
-        # Zero pages found in file. May be corrupt or not a PDF
-        if num_pages == 0: return (False, "No pages were found in this file.\n\nIs this a valid PDF file?", None)
+    # Switches to the code set selected by self.code_set_version. With "auto", the version changes when PCC switches code sets on Oct 1.
+    # Only the selected version is loaded (see code_index.get_code_index()). Raises PdfImportError if the setting names an unavailable version.
+    def select_code_set(self):
+        try: code_index = code_index_for_setting(self.code_set_version)
+        except UnknownCodeSetVersion as version_e:
+            raise PdfImportError(f"{version_e}\n\nPlease correct code_set_version in CM_Settings.csv.", version_e)
+        if code_index != self.code_index:
+            self.code_index = code_index
+            self.code_extractor.code_index = code_index
 
-        # Extracts all text from all pages
-        for page in range(0, self.pdf_reader.getNumPages()):
-            self.pdf_all_text.append(self.pdf_reader.getPage(page).extract_text())
+    # Describes everything other than the PDF itself that changes which codes are found. Part of the cache key.
+    # Backends do not all extract exactly the same text, so the backend is part of it.
+    def scan_signature(self):
+        page_limits = ";".join(f"{kind} {first} {last}" for kind, first, last in self.page_limits) or "all"
+        return f"code_set={self.code_index.version};pdf_backend={self.pdf_backend};sections={self.section_finder != None};pages={page_limits}"
 
-        # Checks if all pages have no text
-        for page_text in self.pdf_all_text:
-            # As soon as one element (page's extracted text) contains text, returns the results
-            if page_text != "": return (self.pdf_all_text, None, None)
+    # Returns the part of a page's text that codes are taken from (all of it unless targeted mode is on)
+    def target_text(self, page_text: str):
+        if self.section_finder == None: return page_text
+        return self.section_finder.section_text(page_text)
 
-        # If method hasn't returned yet, then no text was found in file
-        return (False,
-                "No text found in document.\n\nDoes this PDF have text in it? Is it a scan or a fax?",
-                None
-                )
+    # Parses a page_limits setting into a list of (kind, first, last) tuples. Returns [] for "all" (or "").
+    # Items are separated by semicolons (the settings file is comma-separated): "first N", "last N", "N-M" or "N" (pages numbered from 1).
+    # Raises ValueError if an item is not valid.
+    @staticmethod
+    def parse_page_limits(page_limits: str):
+        parsed = []
+        for item in page_limits.lower().split(";"):
+            item = item.strip()
+            if item in ("", "all"): continue
+            words = item.split()
+            try:
+                if len(words) == 2 and words[0] in ("first", "last"): parsed.append((words[0], int(words[1]), 0))
+                elif "-" in item:
+                    first, last = item.split("-", 1)
+                    parsed.append(("pages", int(first), int(last)))
+                else: parsed.append(("pages", int(item), int(item)))
+            except ValueError: raise ValueError(f"Invalid page limit: {item}") from None
+            if min(parsed[-1][1:]) < 0 or parsed[-1][1] == 0: raise ValueError(f"Invalid page limit: {item}")
+        return parsed
 
-    # Receives list of text (each element = text from PDF page)
-    # I referenced https://library.ahima.org/doc?oid=106177#.Y1XHwnbMK5c to build the regular expression to match the ICD-10 format
-    def apply_regex(self, text_list: list):
-        self.regex_results = [] # List of regex results from the entire PDF document
+    # Returns the sorted list of page indexes (from 0) to import from a PDF with num_pages pages
+    def select_pages(self, num_pages: int):
+        if self.page_limits == []: return list(range(num_pages))
 
-        # Checks for regex results in each list element (extracted page text)
-        for page_text in text_list:
-            page_results = re.findall("[A-Z]\d{2}\.?\w{0,4}", page_text)
+        pages = set()
+        for kind, first, last in self.page_limits:
+            if kind == "first": pages.update(range(min(first, num_pages)))
+            elif kind == "last": pages.update(range(max(num_pages - first, 0), num_pages))
+            else: pages.update(range(first - 1, min(last, num_pages)))
+        return sorted(pages)
 
-            # Passes results to self.process_regex_page_results()
-            self.process_regex_page_results(page_results)
+    # Generator that yields (page index, page text) for each page in pages (sorted page indexes), in page order
+    # Large PDFs are split into page ranges that are extracted in parallel by a process pool. Ranges are yielded as soon as each
+    # one (and every range before it) is done. If the pool fails for any reason, the remaining pages are extracted serially.
+    # futures: page ranges already submitted by self.stream_batch(), which also owns the pool. None = starts a pool here if worthwhile.
+    def iter_page_text(self, pdf_path: str, pages: list, futures: deque = None):
+        num_workers = self.num_workers()
+        next_page = 0 # Position in pages of the first page not yet yielded
 
-        return sorted(self.regex_results)
+        executor = None
+        if futures == None and num_workers > 1 and len(pages) >= self.parallel_min_pages:
+            executor = ProcessPoolExecutor(max_workers = num_workers)
+            futures = self.submit_page_ranges(executor, pdf_path, pages, num_workers)
+
+        if futures != None:
+            try:
+                # Results are popped as they are used so finished ranges' text is not kept around
+                while len(futures) > 0:
+                    for page_text in futures.popleft().result():
+                        yield pages[next_page], page_text
+                        next_page += 1
+            except Exception as parallel_extract_e: self.parallel_error = parallel_extract_e
+            finally:
+                if executor != None: executor.shutdown(wait = False, cancel_futures = True)
+
+        for start, stop in self.page_spans(pages[next_page:]):
+            for page, page_text in enumerate(self.pdf_reader.iter_text(start, stop), start): yield page, page_text
+
+    # Submits a PDF's page ranges to a process pool. Returns the futures in page order.
+    def submit_page_ranges(self, executor: ProcessPoolExecutor, pdf_path: str, pages: list, num_workers: int):
+        return deque(
+            executor.submit(extract_page_range, pdf_path, start, stop, self.pdf_backend)
+            for start, stop in self.page_ranges(self.page_spans(pages), num_workers)
+        )
+
+    # Groups sorted page indexes into (start, stop) spans of consecutive pages
+    @staticmethod
+    def page_spans(pages: list):
+        spans = []
+        for page in pages:
+            if spans != [] and spans[-1][1] == page: spans[-1][1] = page + 1
+            else: spans.append([page, page + 1])
+        return [(start, stop) for start, stop in spans]
 
-    # Processes results from re.findall()
-    # If any results, process_regex_page_results, checks them (actual codes, not already in list), and appends them to list self.regex_results
-    def process_regex_page_results(self, page_results: list):
-        if page_results == []: return
-        for code in page_results:
-            if code not in self.regex_results: # Checks this first because it's a quick way to rule out an already found code
-                if code.replace(".", "") in codes_list: self.regex_results.append(code) # Is in master code list
+    # Number of worker processes to use for parallel extraction
+    def num_workers(self):
+        if self.pdf_workers <= 0: return os.cpu_count() or 1
+        return self.pdf_workers
+
+    # Splits (start, stop) spans of pages into (start, stop) ranges for the process pool
+    # Several ranges per worker keeps all workers busy when some pages are slower than others and lets the first pages arrive sooner.
+    @staticmethod
+    def page_ranges(spans: list, num_workers: int):
+        num_pages = sum(stop - start for start, stop in spans)
+        num_ranges = min(num_pages, num_workers * 4)
+        range_size = -(-num_pages // num_ranges) # Ceiling division
+        return [(start, min(start + range_size, stop)) for span_start, stop in spans for start in range(span_start, stop, range_size)]
+
+    # Receives list of text (each element = text from PDF page)
+    # Returns sorted list of unique valid codes. Per-page hit counts are left in self.page_hits.
+    # single_scan = True runs the regex once over all pages joined together (see CodeExtractor.scan_pages())
+    def apply_regex(self, text_list: list, single_scan: bool = False):
+        self.code_extractor.reset()
+        if self.section_finder != None:
+            self.section_finder.reset()
+            text_list = [self.section_finder.section_text(page_text) for page_text in text_list]
+        self.regex_results = self.code_extractor.scan_pages(text_list, single_scan = single_scan)
+        self.page_hits = self.code_extractor.page_hits
+
+        return sorted(self.regex_results)
 
     # Checks if Excel file is open (Excel creates hidden file prepended with "~$" when file is open)
     def is_excel_file_open(self, excel_path):
-        if path.isfile("~$" + excel_path): return True
\ No newline at end of file
+        if path.isfile("~$" + excel_path): return True
+
+# ----------------------------EXCEPTIONS CLASSES----------------------------
+# Raised by PdfProcessing.stream_pdf() when a PDF cannot be imported
+# user_msg is a message that can be shown to the user. exception is the captured exception to log (None if there is nothing to log).
+class PdfImportError(Exception):
+    def __init__(self, user_msg: str, exception = None):
+        self.user_msg = user_msg
+        self.exception = exception
+        super().__init__(user_msg)
@@ -0,0 +1,55 @@
+import sys
+
+if __name__ == "__main__":
+    print("This is not the main module. Do not execute directly.")
+    sys.exit()
+
+import re
+
+# Headings of the sections codes are taken from in targeted mode
+TARGET_HEADINGS = (
+    r"(?:(?:admitting|admission|discharge|principal|primary|secondary|final|active|other)\s+)?diagnos[ie]s",
+    r"(?:active\s+)?problem\s+list", r"active\s+problems",
+    r"assessment(?:\s*(?:/|and|&)\s*plan)?", r"a\s*/\s*p", r"impression(?:\s*(?:/|and|&)\s*plan)?"
+)
+
+# Headings of other sections. Reaching one of these ends a target section.
+# A heading that is in neither list does not end a section, so an unknown heading can only make targeted mode scan more, never less.
+OTHER_HEADINGS = (
+    r"medications?(?:\s+list)?", r"medication\s+administration\s+record", r"mar", r"home\s+medications",
+    r"labs?", r"laboratory(?:\s+(?:results|data))?", r"results", r"imaging", r"radiology", r"microbiology",
+    r"vital\s+signs", r"vitals", r"allergies", r"immunizations", r"chief\s+complaint", r"reason\s+for\s+(?:admission|visit)",
+    r"history\s+of\s+present\s+illness", r"hpi", r"review\s+of\s+systems", r"ros", r"physical\s+exam(?:ination)?",
+    r"(?:past\s+)?(?:medical|surgical)\s+history", r"social\s+history", r"family\s+history",
+    r"orders", r"procedures", r"nursing\s+notes?", r"progress\s+notes?", r"intake\s*(?:/|and|&)\s*output"
+)
+
+# A heading is one of the above at the start of a line (optionally numbered), followed by a colon or the end of the line
+HEADING_PATTERN = re.compile(
+    r"^[ \t]*(?:\d+[.)][ \t]*)?(?:(?P<target>" + "|".join(TARGET_HEADINGS) + r")|" + "|".join(OTHER_HEADINGS) + r")[ \t]*(?::|$)",
+    re.IGNORECASE | re.MULTILINE
+)
+
+# Finds the parts of a document that are in a target section (Diagnoses, Problem List, Assessment/Plan, etc.)
+# Pages are passed in order. A section runs from its heading to the next known heading, so it can continue onto later pages.
+# Headings are found with one regex pass over each page, which costs far less than validating every code candidate on the page.
+# One SectionFinder is used per document; call reset() before a new document.
+class SectionFinder:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.in_section = False # True if the previous page ended inside a target section
+
+    # Returns the text of the page that is inside target sections (spans joined by newlines). Returns "" if none is.
+    def section_text(self, page_text: str):
+        spans = []
+        span_start = 0 if self.in_section else None
+        for heading in HEADING_PATTERN.finditer(page_text):
+            if span_start != None: spans.append(page_text[span_start:heading.start()])
+            if heading.group("target") != None: span_start = heading.start()
+            else: span_start = None
+        if span_start != None: spans.append(page_text[span_start:])
+
+        self.in_section = span_start != None
+        return "\n".join(spans)
@@ -0,0 +1,79 @@
+import sys
+
+if __name__ == "__main__":
+    print("This is not the main module. Do not execute directly.")
+    sys.exit()
+
+import sqlite3, json
+
+# Local SQLite working store for codes (used instead of CM_Codes.xlsx when the working_store setting is "sqlite")
+# Codes, their details (the Excel table's columns), where each was found and its description are kept in one table, one row per table row.
+# Rows keep the order they had in Excel (row_num, 0 = first data row) and are looked up by code through an index on the normalized code.
+# Every change is one transaction, so the store is never left half-written, and unlike an xlsx file it can't be locked by Excel.
+# Excel is only used when the user asks for it: DataframeHandler exports the rows to CM_Codes.xlsx for editing and imports the edits back.
+class SqliteStore:
+    # Columns of a row, in Excel table order (A:F), then the Source and Description columns
+    columns = ("code", "resolved_date", "rank", "classification", "comments", "confidential", "source", "description")
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS codes (row_num INTEGER PRIMARY KEY, code_key TEXT NOT NULL, "
+                + ", ".join(f"{column} TEXT NOT NULL DEFAULT ''" for column in self.columns) + ")"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS codes_code_key ON codes (code_key)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS store_info (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    # Replaces all rows. rows are sequences of values in self.columns order (missing values at the end are "").
+    def replace_rows(self, rows):
+        with self.connection:
+            self.connection.execute("DELETE FROM codes")
+            self.connection.executemany(
+                f"INSERT INTO codes (row_num, code_key, {', '.join(self.columns)}) VALUES ({', '.join('?' * (len(self.columns) + 2))})",
+                (self.row_values(row_num, row) for row_num, row in enumerate(rows))
+            )
+
+    # Returns all rows (lists of values in self.columns order), in order
+    def rows(self):
+        return [list(row) for row in self.connection.execute(f"SELECT {', '.join(self.columns)} FROM codes ORDER BY row_num")]
+
+    # Returns the row numbers of a code (dots, case and surrounding whitespace do not matter)
+    def find_code(self, code: str):
+        return [row[0] for row in self.connection.execute(
+            "SELECT row_num FROM codes WHERE code_key = ? ORDER BY row_num", (self.normalize(code),)
+        )]
+
+    # Changes some values of one row, e.g., update_row(3, rank = "Primary", comments = "Per H&P")
+    def update_row(self, row_num: int, **values):
+        for column in values:
+            if column not in self.columns: raise ValueError(f"{column} is not a column of the codes store")
+        if "code" in values: values["code_key"] = self.normalize(values["code"])
+        with self.connection:
+            self.connection.execute(
+                f"UPDATE codes SET {', '.join(column + ' = ?' for column in values)} WHERE row_num = ?", list(values.values()) + [row_num]
+            )
+
+    # Number of rows with a code
+    def count_codes(self): return self.connection.execute("SELECT COUNT(*) FROM codes WHERE code != ''").fetchone()[0]
+
+    # Returns a stored value (any JSON value), or default if it has not been set
+    def get_info(self, name: str, default = None):
+        row = self.connection.execute("SELECT value FROM store_info WHERE name = ?", (name,)).fetchone()
+        if row == None: return default
+        return json.loads(row[0])
+
+    def set_info(self, name: str, value):
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO store_info (name, value) VALUES (?, ?)", (name, json.dumps(value)))
+
+    def close(self): self.connection.close()
+
+    # (row_num, code_key, values...) for an INSERT
+    def row_values(self, row_num: int, row):
+        row = [str(value) for value in row] + [""] * (len(self.columns) - len(row))
+        return [row_num, self.normalize(row[0])] + row[:len(self.columns)]
+
+    @staticmethod
+    def normalize(code: str): return code.strip().replace(".", "").upper()
@@ -0,0 +1,54 @@
+import sys
+
+if __name__ == "__main__":
+    print("This is not the main module. Do not execute directly.")
+    sys.exit()
+
+import subprocess
+
+# Startup timing report (python main.py --startup-report)
+# Each measurement runs in a fresh Python process with -X importtime, which reports the time each import took: its own time and its
+# cumulative time (including everything it imported). The report shows what is imported before the main window appears, which modules
+# cost the most, and what each deferred module (see tkinter_handler.deferred_modules) costs when it is imported after the window is up.
+# Python's own start-up is not included.
+
+# Returns [(depth, self seconds, cumulative seconds, module name), ...] for the imports made by a Python statement, in import order
+# Depth 0 is an import made by the statement itself, depth 1 an import made by that module, etc.
+def import_times(statement: str):
+    child = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], capture_output = True, text = True)
+    if child.returncode != 0: raise RuntimeError(child.stderr.strip().splitlines()[-1])
+
+    times = []
+    for line in child.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line: continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        times.append((depth, int(self_us) / 1e6, int(cumulative_us) / 1e6, name.strip()))
+    return times
+
+# Prints the report. top = number of modules listed under the startup imports.
+def print_startup_report(top: int = 15):
+    from tkinter_handler import deferred_modules
+
+    # Modules imported by tkinter_handler (not the ones Python itself imports at start-up): (cumulative, self, name, imported by)
+    parents = []
+    rows = []
+    for depth, self_time, cumulative, name in reversed(import_times("import tkinter_handler")): # A module's line comes after its imports'
+        parents = parents[:depth]
+        if (parents + [name])[0] == "tkinter_handler": rows.append((cumulative, self_time, name, parents[-1] if parents != [] else ""))
+        parents.append(name)
+    print(f"Imported before the window appears: {rows[0][0]:.3f} s ({len(rows)} modules)\n")
+
+    print(f"{'Cumulative':>10}  {'Self':>8}  Module (imported by)")
+    for cumulative, self_time, name, parent in sorted(rows, reverse = True)[:top]:
+        imported_by = f" ({parent})" if parent != "" else ""
+        print(f"{cumulative:9.3f}s  {self_time:7.3f}s  {name}{imported_by}")
+
+    print("\nDeferred until after the window appears (imported in the background, or on first use):")
+    for module_name in deferred_modules:
+        try: deferred = import_times(f"import tkinter_handler; import {module_name}")
+        except RuntimeError as import_e:
+            print(f"{'':>9}   {module_name}: could not be imported ({import_e})")
+            continue
+        cumulative = [times[2] for times in deferred if times[0] == 0 and times[3] == module_name]
+        print(f"{cumulative[-1] if cumulative != [] else 0:9.3f}s  {module_name}")
@@ -0,0 +1,59 @@
+import unittest
+from code_index import load_code_index
+from code_extractor import CodeExtractor
+
+# A packet with the repeats skip_repeats is meant for: identical pages, a header/footer on every page and codes on repeated lines
+header = "Patient: DOE, JANE  MRN 12345  Facility A01 Unit B22"
+pages = [
+    header + "\nDiagnoses: E11.9 Type 2 diabetes, I10 Hypertension\nPage 1",
+    header + "\nMedications for E11.9: metformin\nLab Z79.4 R69 R69\nPage 2",
+    header + "\nDiagnoses: E11.9 Type 2 diabetes, I10 Hypertension\nPage 1",
+    header + "\nAssessment: M54.50 low back pain, E11.9\nE11.65 hyperglycemia E1165 e11.65\nPage 4",
+    header + "\nMedications for E11.9: metformin\nLab Z79.4 R69 R69\nPage 5",
+    "",
+    header + "\n\n  Diagnoses:   E11.9 Type 2 diabetes,   I10 Hypertension  \nPage 1",
+]
+
+# Every skip_repeats mode (and single_scan) must find the same codes, in the same order, with the same hit count on every page
+class TestSkipRepeatsParity(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.code_index = load_code_index()
+        extractor = CodeExtractor(cls.code_index, "off")
+        extractor.scan_pages(pages)
+        cls.expected_codes = extractor.codes
+        cls.expected_page_hits = extractor.page_hits
+
+    def test_reference(self):
+        self.assertEqual(self.expected_codes, ["E11.9", "I10", "Z79.4", "R69", "M54.50", "E11.65", "E1165"])
+        self.assertEqual(self.expected_page_hits, [2, 4, 2, 4, 4, 0, 2])
+
+    def test_modes(self):
+        for skip_repeats in CodeExtractor.skip_repeats_options:
+            extractor = CodeExtractor(self.code_index, skip_repeats)
+            new_codes = []
+            for page_text in pages: new_codes.extend(extractor.scan_page(page_text))
+            self.assertEqual(extractor.codes, self.expected_codes, skip_repeats)
+            self.assertEqual(new_codes, self.expected_codes, skip_repeats)
+            self.assertEqual(extractor.page_hits, self.expected_page_hits, skip_repeats)
+
+    def test_skipped_text(self):
+        extractor = CodeExtractor(self.code_index, "lines")
+        extractor.scan_pages(pages)
+        self.assertGreater(extractor.skipped_bytes, 0)
+
+    def test_single_scan(self):
+        extractor = CodeExtractor(self.code_index)
+        self.assertEqual(extractor.scan_pages(pages, single_scan = True), self.expected_codes)
+        self.assertEqual(extractor.page_hits, self.expected_page_hits)
+
+    def test_reset(self):
+        extractor = CodeExtractor(self.code_index, "lines")
+        extractor.scan_pages(pages)
+        extractor.reset()
+        extractor.scan_pages(pages[:1])
+        self.assertEqual(extractor.codes, ["E11.9", "I10"])
+        self.assertEqual(extractor.page_hits, [2])
+
+if __name__ == "__main__":
+    unittest.main()
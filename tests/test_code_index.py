@@ -0,0 +1,52 @@
+import unittest
+import os, tempfile
+from full_codes import codes_list
+from code_index import CodeIndex, code_table_path
+from code_table import CodeTable, build_code_table
+
+# CodeIndex must give the same answers whether it holds the memory-mapped CodeTable or a set built from full_codes.py
+class TestCodeTableEquivalence(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.set_index = CodeIndex(codes_list, "2022")
+        cls.table_index = CodeIndex(CodeTable(code_table_path), "2022")
+
+    def test_same_codes(self):
+        self.assertEqual(len(self.set_index), len(self.table_index))
+        self.assertEqual(list(self.table_index.sorted_codes), self.set_index.sorted_codes)
+        self.assertEqual(self.table_index.categories, self.set_index.categories)
+
+    def test_membership(self):
+        for code in codes_list:
+            self.assertIn(code, self.table_index)
+        candidates = ["E11.9", "e119", " E11.9 ", "E11", "A09", "E1", "E11.99", "Z99.999", "I10.0", "", "ABCDEFGH", "E11.9XXX"]
+        for candidate in candidates:
+            self.assertEqual(candidate in self.table_index, candidate in self.set_index, candidate)
+            self.assertEqual(self.table_index.dotted(candidate), self.set_index.dotted(candidate), candidate)
+
+    def test_validate_many(self):
+        candidates = ["E11.9", "E11.99", "I10", "I1O", "Z79.4", "R69.9", "M54.50", "M54.5", "A00.0", "a00.0", "Q99.9"]
+        self.assertEqual(self.table_index.validate_many(candidates), self.set_index.validate_many(candidates))
+        self.assertEqual(self.table_index.category_prefilter(candidates), self.set_index.category_prefilter(candidates))
+
+    def test_hierarchy(self):
+        for prefix in ("E11", "E11.6", "e116", "Z79", "S72.0", "U07"):
+            self.assertEqual(list(self.table_index.codes_with_prefix(prefix)), self.set_index.codes_with_prefix(prefix), prefix)
+            self.assertEqual(self.table_index.children(prefix), self.set_index.children(prefix), prefix)
+            self.assertEqual(self.table_index.has_prefix(prefix), self.set_index.has_prefix(prefix), prefix)
+
+    def test_small_table(self):
+        codes = ["A09", "E11.9", "E11.65", "I10", "Z79.4"]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            table_path = os.path.join(temp_dir, "codes.bin")
+            build_code_table(codes, "test", table_path)
+            table = CodeTable(table_path)
+            try:
+                self.assertEqual(table.version, "test")
+                self.assertEqual(list(table), ["A09", "E1165", "E119", "I10", "Z794"])
+                for code in ("A09", "E119", "E1165", "I10", "Z794"): self.assertIn(code, table)
+                for code in ("A0", "E11", "E116", "E11655", "I100", "Z79", ""): self.assertNotIn(code, table)
+            finally: table.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import os, json, tempfile, datetime
+from code_sets import CodeSetDeltas, UnknownCodeSetVersion, InvalidCodeSetDeltas
+
+deltas = {
+    "base": "2022",
+    "deltas": {
+        "2023": {"add": ["E1100", "Z999"], "delete": ["A09"]},
+        "2024": {"add": ["A09"], "delete": ["Z999"]},
+    }
+}
+
+class TestCodeSetDeltas(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.deltas_path = os.path.join(self.temp_dir.name, "deltas.json")
+        with open(self.deltas_path, "w", encoding = "utf-8") as deltas_file: json.dump(deltas, deltas_file)
+        self.code_set_deltas = CodeSetDeltas(self.deltas_path, "2022")
+
+    def tearDown(self): self.temp_dir.cleanup()
+
+    def test_versions(self):
+        self.assertEqual(self.code_set_deltas.versions, ["2022", "2023", "2024"])
+
+    # Fiscal year N starts on Oct 1 of year N - 1
+    def test_version_for_date(self):
+        version_for_date = self.code_set_deltas.version_for_date
+        self.assertEqual(version_for_date(datetime.date(2021, 9, 30)), "2022")
+        self.assertEqual(version_for_date(datetime.date(2021, 10, 1)), "2022")
+        self.assertEqual(version_for_date(datetime.date(2022, 9, 30)), "2022")
+        self.assertEqual(version_for_date(datetime.date(2022, 10, 1)), "2023")
+        self.assertEqual(version_for_date(datetime.date(2023, 9, 30)), "2023")
+        self.assertEqual(version_for_date(datetime.date(2023, 10, 1)), "2024")
+        self.assertEqual(version_for_date(datetime.date(2023, 12, 31)), "2024")
+        self.assertEqual(version_for_date(datetime.date(2030, 1, 1)), "2024") # Newest available version
+        self.assertEqual(version_for_date(datetime.date(2015, 6, 1)), "2022") # Before the base version
+
+    def test_resolve(self):
+        self.assertEqual(self.code_set_deltas.resolve(" 2023 "), "2023")
+        self.assertEqual(self.code_set_deltas.resolve("AUTO"), self.code_set_deltas.version_for_date(datetime.date.today()))
+        self.assertRaises(UnknownCodeSetVersion, self.code_set_deltas.resolve, "2019")
+
+    def test_changes(self):
+        base_codes = {"A09", "E119", "I10"}
+        self.assertEqual(self.code_set_deltas.changes("2022", base_codes), (set(), set()))
+        self.assertEqual(self.code_set_deltas.changes("2023", base_codes), ({"E1100", "Z999"}, {"A09"}))
+        self.assertEqual(self.code_set_deltas.changes("2024", base_codes), ({"E1100"}, set()))
+
+    def test_wrong_base(self):
+        self.assertRaises(InvalidCodeSetDeltas, CodeSetDeltas, self.deltas_path, "2021")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+import os, tempfile
+from document_adapters import CdaAdapter
+
+cda_document = """<ClinicalDocument xmlns="urn:hl7-org:v3">
+ <component><section><title>Problems</title>
+  <text>Diagnoses: I10 <paragraph>E78.5 hyperlipidemia</paragraph> and Z79.4 <content>insulin</content> daily</text>
+  <entry><value code="E11.9" codeSystem="2.16.840.1.113883.6.90"/>reviewed <value code="44054006" codeSystem="2.16.840.1.113883.6.96"/></entry>
+ </section></component>
+ <component><section><text>Plan <list><item>one</item><item>two <sub>x</sub> three</item></list>done</text></section></component>
+</ClinicalDocument>
+"""
+
+class TestCdaAdapter(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.doc_path = os.path.join(self.temp_dir.name, "document.xml")
+        with open(self.doc_path, "w", encoding = "utf-8") as doc_file: doc_file.write(cda_document)
+
+    def tearDown(self): self.temp_dir.cleanup()
+
+    # A parent's text comes before its children's and each child's tail before the next child (SectionFinder depends on the order)
+    def test_document_order(self):
+        pages = list(CdaAdapter(self.doc_path).iter_pages())
+        self.assertEqual(pages, [
+            "Problems\nDiagnoses: I10\nE78.5 hyperlipidemia\nand Z79.4\ninsulin\ndaily\nE11.9\nreviewed",
+            "Plan\none\ntwo\nx\nthree\ndone",
+        ])
+
+if __name__ == "__main__":
+    unittest.main()
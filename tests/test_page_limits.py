@@ -0,0 +1,42 @@
+import unittest
+from pdf_processing import PdfProcessing
+
+class TestParsePageLimits(unittest.TestCase):
+    def test_valid(self):
+        parse_page_limits = PdfProcessing.parse_page_limits
+        self.assertEqual(parse_page_limits("all"), [])
+        self.assertEqual(parse_page_limits(""), [])
+        self.assertEqual(parse_page_limits("First 20; LAST 10"), [("first", 20, 0), ("last", 10, 0)])
+        self.assertEqual(parse_page_limits(" 1-5 ;30; last 10;"), [("pages", 1, 5), ("pages", 30, 30), ("last", 10, 0)])
+
+    def test_invalid(self):
+        for page_limits in ("first", "first x", "1-z", "0", "0-4", "-3", "last -2", "pages 4", "1,5"):
+            self.assertRaises(ValueError, PdfProcessing.parse_page_limits, page_limits)
+
+    # An invalid setting imports every page, and the error is kept so CCWindow can report it
+    def test_invalid_setting(self):
+        pdf_processor = PdfProcessing(page_limits = "first x")
+        self.assertEqual(pdf_processor.page_limits, [])
+        self.assertIsInstance(pdf_processor.page_limits_error, ValueError)
+        self.assertIsNone(PdfProcessing(page_limits = "first 2").page_limits_error)
+
+class TestSelectPages(unittest.TestCase):
+    def select_pages(self, page_limits: str, num_pages: int): return PdfProcessing(page_limits = page_limits).select_pages(num_pages)
+
+    def test_all(self):
+        self.assertEqual(self.select_pages("all", 4), [0, 1, 2, 3])
+        self.assertEqual(self.select_pages("all", 0), [])
+
+    def test_first_last(self):
+        self.assertEqual(self.select_pages("first 2; last 2", 10), [0, 1, 8, 9])
+        self.assertEqual(self.select_pages("first 20; last 20", 30), list(range(30))) # Overlapping limits
+        self.assertEqual(self.select_pages("first 5", 3), [0, 1, 2])
+        self.assertEqual(self.select_pages("last 5", 3), [0, 1, 2])
+
+    def test_ranges(self):
+        self.assertEqual(self.select_pages("2-4; 7", 10), [1, 2, 3, 6])
+        self.assertEqual(self.select_pages("8-20; 30", 10), [7, 8, 9]) # Pages past the end are ignored
+        self.assertEqual(self.select_pages("4-2", 10), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import datetime
+import pandas as pd
+from code_index import load_code_index
+from code_descriptions import CodeDescriptions
+from upload_plan import build_upload_plan, parse_dates, match_option, rank_options, classification_options
+
+class TestParseDates(unittest.TestCase):
+    def test_formats(self):
+        year = datetime.datetime.now().year
+        dates = pd.Series(["01/02/2024", "1-2-24", "2024-01-02 00:00:00", "Jan 2, 2024", "January 2 2024", "1.2.2024", "3/4", "2024/01/02"])
+        parsed = parse_dates(dates).dt.strftime("%m/%d/%Y").tolist()
+        self.assertEqual(parsed, ["01/02/2024"] * 6 + [f"03/04/{year}", "01/02/2024"])
+
+    def test_not_dates(self):
+        parsed = parse_dates(pd.Series(["", "yesterday", "13/45/2024", "02/30/2024"]))
+        self.assertTrue(parsed.isna().all())
+
+    # 2-digit years more than 10 years in the future are in the last century
+    def test_two_digit_year(self):
+        next_year = (datetime.datetime.now().year + 1) % 100
+        far_year = (datetime.datetime.now().year + 20) % 100
+        parsed = parse_dates(pd.Series([f"01/02/{next_year:02}", f"01/02/{far_year:02}"]))
+        self.assertEqual(parsed.dt.year.tolist(), [datetime.datetime.now().year + 1, datetime.datetime.now().year + 20 - 100])
+
+class TestMatchOption(unittest.TestCase):
+    def test_exact(self):
+        self.assertEqual(match_option("secondary", rank_options), "Secondary")
+        self.assertEqual(match_option("OTHER DIAGNOSIS", rank_options), "Other Diagnosis")
+        self.assertEqual(match_option("3", rank_options), "3")
+        self.assertEqual(match_option("during stay", classification_options), "During Stay")
+
+    # A typo or a cut-off value is not entered as whichever option it resembles
+    def test_not_options(self):
+        for value in ("Second", "Primary", "Diagnosis 1", "Diagnosis", "10", "Othr", ""):
+            self.assertIsNone(match_option(value, rank_options), value)
+        for value in ("Admit", "Re-admission", "Stay"):
+            self.assertIsNone(match_option(value, classification_options), value)
+
+class TestBuildUploadPlan(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.code_index = load_code_index()
+        cls.code_descriptions = CodeDescriptions("") # No store: invalid codes are all "unknown"
+
+    def test_plan(self):
+        df_codes = pd.DataFrame([
+            ["e119", "1/2/2024", "secondary", "", "Note", "yes"],
+            ["I10", "not a date", "Second", "history", None, "maybe"],
+            ["E11.9", "", "", "", "", ""],
+            ["ZZZ.9", "", "", "", "", ""],
+            ["", "", "", "", "", ""],
+            [" A09 ", datetime.datetime(2024, 3, 4), "Other", "Admit", "", "No"],
+        ])
+        plan = build_upload_plan(df_codes, self.code_index, self.code_descriptions)
+
+        rows = [(row.row_num, row.code, row.resolved_date, row.rank, row.classification, row.comments, row.confidential) for row in plan.code_rows]
+        self.assertEqual(rows, [
+            (0, "E11.9", "01/02/2024", "Secondary", "Admission", "Note", "Yes"),
+            (1, "I10", "", "Other", "History", "", ""),
+            (5, "A09", "03/04/2024", "Other", "Admission", "", ""),
+        ])
+        self.assertEqual(plan.rejected_codes, ["ZZZ.9"])
+        self.assertEqual(plan.notes, [
+            "ZZZ.9 -- Not entered: not a valid ICD-10 code",
+            "E11.9 -- Not entered again: listed more than once",
+            "I10 -- Failed to enter not a date in Resolved Date field (not a date)",
+            "I10 -- Failed to enter Second in Rank drop-down menu (not an option, Other entered instead)",
+            "A09 -- Failed to enter Admit in Classification drop-down (not an option, Admission entered instead)",
+            "I10 -- Failed to enter maybe in 'Confidential' checkbox (not yes or no)",
+        ])
+
+    # Columns missing from the table are blank
+    def test_code_column_only(self):
+        plan = build_upload_plan(pd.DataFrame([["I10"], ["E11.9"]]), self.code_index, self.code_descriptions)
+        self.assertEqual([(row.code, row.rank, row.classification) for row in plan.code_rows], [("I10", "Other", "Admission"), ("E11.9", "Other", "Admission")])
+        self.assertEqual(plan.notes, [])
+
+if __name__ == "__main__":
+    unittest.main()
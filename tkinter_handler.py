@@ -4,13 +4,16 @@ if __name__ == "__main__":
     print("This is not the main module. Do not execute directly.")
     sys.exit()
 
-import os, pyperclip
+import os, threading, importlib
 from tkinter import Tk, Button, filedialog, messagebox, Label, Frame, Canvas, LEFT, SUNKEN
-from PIL import Image, ImageTk
-from pdf_processing import PdfProcessing
+from PIL import Image, ImageTk # Needed to draw the window (icon and logo)
 from error_logger import ErrorLogger
-from pandas_handler import DataframeHandler
-from pcc_handler import PccHandler
+
+# Modules that are only needed after a button is clicked. They are not imported before the window appears (pandas, openpyxl, selenium
+# and webdriver_manager take seconds to import on slow machines). CCWindow.warm_up() imports them in the background once the window is up.
+# pdf_processing (with document_adapters and concurrent.futures) is needed first, so it is imported first.
+# python main.py --startup-report shows what each one costs (see startup_report.py).
+deferred_modules = ("pdf_processing", "pandas_handler", "pcc_handler", "pyperclip")
 
 class CCWindow:
     def __init__(self,
@@ -31,13 +34,30 @@ class CCWindow:
                  comm_x: str,
                  confid_x: str,
                  log_file_name: str,
-                 FID: str
+                 FID: str,
+                 pdf_workers: int,
+                 pdf_cache_dir: str,
+                 pdf_cache_max_mb: int,
+                 code_set_version: str,
+                 pdf_skip_repeats: str,
+                 pdf_backend: str,
+                 pdf_targeted_sections: bool,
+                 pdf_page_limits: str,
+                 working_store: str,
+                 event_log_file: str
                  ):
         # --------- PDF settings/data ---------
         self.pdf_default_dir = pdf_default_dir # Default directory to open when user is selecting a PDF to import
-        self.pdf_file_dir = None # Directory of PDF user selects
+        self.pdf_workers = pdf_workers # Worker processes for extracting text from large PDFs (1 = none, 0 = one per CPU core)
+        self.pdf_cache_dir = pdf_cache_dir # Folder for cached PDF extraction results (re-imported PDFs are not parsed again)
+        self.pdf_cache_max_mb = pdf_cache_max_mb # Size cap of the PDF cache. 0 turns the cache off.
+        self.pdf_backend = pdf_backend # Library used to extract PDF text (PyPDF2, pypdf or pdfminer). "python benchmarks.py backends" picks the fastest.
+        self.pdf_targeted_sections = pdf_targeted_sections # True = codes only taken from Diagnoses, Problem List, Assessment/Plan, etc. sections
+        self.pdf_page_limits = pdf_page_limits # Pages imported from each PDF, e.g., "first 20; last 20" ("all" = every page)
+        self.pdf_skip_repeats = pdf_skip_repeats # Repeated PDF text scanned only once: "off", "pages" or "lines" (also repeated lines)
+        self.code_set_version = code_set_version # ICD-10 code set version ("auto" = the version PCC uses today, or a fiscal year such as "2024")
+        self.pdf_file_dir = None # Directory of PDF user selects (first PDF if several are imported at once)
         self.extracted_codes = None # ICD-10 codes extracted from PDF
-        self.reset_pdf_text_extracted() # Sets self.pdf_text_extracted to default values of None
         self.import_fails_copy = "" # Text that will be copied to clipboard about code failures
 
         # --------- Button setup ---------
@@ -63,8 +83,10 @@ class CCWindow:
         self.excel_file_sheet_name = excel_file_sheet_name # Excel sheet codes are in
         self.excel_data_first_row = excel_data_first_row # Data range (cells within the table, not including headers, for writing not reading)
         self.template_file_path = template_file_path # Excel template path (file name). Used to create new CM_Codes.xlsx file when codes are imported.
+        self.working_store = working_store # Where codes are kept: "excel" (CM_Codes.xlsx) or "sqlite" (CM_Codes.db, exported to Excel for editing)
 
         self.log_file_name = log_file_name
+        self.event_log_file = event_log_file # JSON lines with the timing of each PCC upload step ("" = not written)
 
         # --------- Classes ---------
         """
@@ -74,15 +96,9 @@ class CCWindow:
         """
         self.pcc_handler = None
 
-        self.pdf_processor = PdfProcessing()
         self.error_logger = ErrorLogger(self.log_file_name)
-        self.dataframe_handler = DataframeHandler(
-            self.excel_file_path,
-            self.excel_file_sheet_name,
-            self.excel_data_first_row,
-            self.template_file_path,
-            self.log_file_name
-        )
+        self._pdf_processor = None # PdfProcessing. Created on first use (see self.pdf_processor).
+        self._dataframe_handler = None # DataframeHandler. Created on first use (see self.dataframe_handler).
 
         # --------- Setup for PCC interaction ---------
         self.pcc_url = pcc_url
@@ -167,7 +183,7 @@ class CCWindow:
 
         # Import/open Excel buttons' instructions (steps_frame col 0, rows 0-3)
         self.place_text("1. Code setup", self.step_1_row, bold = True)
-        self.place_text("    Import codes from a PDF file", self.step_1_row + 1)
+        self.place_text("    Import codes from PDF file(s)\n    (Alt+F for a whole folder)", self.step_1_row + 1)
         self.place_text("    AND/OR", self.step_1_row + 2)
         self.place_text("    Open and edit Excel table of codes", self.step_1_row + 3)
 
@@ -187,6 +203,7 @@ class CCWindow:
         )
         self.button_list.append(self.import_pdf_button)
         self.main_window.bind('<Alt-i>', self.import_pdf)
+        self.main_window.bind('<Alt-f>', self.import_pdf_folder) # Imports every PDF in a folder
 
         # Launch CM_Codes.xlsx button (steps_frame col 1, row 3)
         self.open_excel_file_button = Button(
@@ -326,8 +343,73 @@ class CCWindow:
         self.button_list.append(self.exit_button)
         self.main_window.bind('<Alt-x>', self.close_out)
 
+        self.main_window.after(200, self.start_warm_up) # Once the window has been drawn
+        self.main_window.after(250, self.report_startup_problems)
         self.main_window.mainloop()
 
+    # PdfProcessing, created the first time it is needed (also loads the code index)
+    # self.report_startup_problems() needs it just after the window appears, so it is ready before the first import.
+    @property
+    def pdf_processor(self):
+        if self._pdf_processor == None:
+            from pdf_processing import PdfProcessing
+            self._pdf_processor = PdfProcessing(
+                self.pdf_workers,
+                self.pdf_cache_dir,
+                self.pdf_cache_max_mb,
+                self.code_set_version,
+                self.pdf_skip_repeats,
+                self.pdf_backend,
+                self.pdf_targeted_sections,
+                self.pdf_page_limits
+            )
+            if self._pdf_processor.page_limits_error != None:
+                self.error_logger.log_error(f"Invalid pdf_page_limits setting: {self.pdf_page_limits}", self._pdf_processor.page_limits_error)
+        return self._pdf_processor
+
+    # DataframeHandler, created the first time it is needed (importing pandas_handler imports pandas and openpyxl)
+    @property
+    def dataframe_handler(self):
+        if self._dataframe_handler == None:
+            from pandas_handler import DataframeHandler
+            self._dataframe_handler = DataframeHandler(
+                self.excel_file_path,
+                self.excel_file_sheet_name,
+                self.excel_data_first_row,
+                self.template_file_path,
+                self.log_file_name,
+                self.working_store
+            )
+        return self._dataframe_handler
+
+    # Tells the user about settings in CM_Settings.csv that could not be used (they were also logged by self.pdf_processor)
+    # and about a missing code description store (it is not shipped and has to be built, see README.md)
+    def report_startup_problems(self):
+        if self.pdf_processor.page_limits_error != None:
+            messagebox.showwarning(
+                "Invalid setting",
+                f"The pdf_page_limits setting in CM_Settings.csv (\"{self.pdf_page_limits}\") could not be read:\n"
+                f"{self.pdf_processor.page_limits_error}\n\n"
+                "Every page of each PDF will be imported until it is corrected."
+            )
+        from code_descriptions import descriptions_path
+        if not os.path.isfile(descriptions_path):
+            messagebox.showwarning(
+                "Code descriptions not built",
+                f"The code description store ({os.path.basename(descriptions_path)}) was not found.\n\n"
+                "Imported codes will have no descriptions in the Excel file, and retired codes will be reported as not valid "
+                "instead of retired.\n\nBuild it with build_code_descriptions.py (see \"Code descriptions\" in README.md)."
+            )
+
+    # Imports the deferred modules in a background thread, so the first click that needs one usually doesn't wait for it
+    def start_warm_up(self):
+        threading.Thread(target = self.warm_up, name = "Warm-up", daemon = True).start()
+
+    def warm_up(self):
+        for module_name in deferred_modules:
+            try: importlib.import_module(module_name)
+            except Exception: pass # The error comes up again (and is reported) when the module is used
+
     # Places instructions text in step frame
     # Receives text to place, row to placei t on, whether it's bold or not, and whether it needs extra y-padding
     def place_text(self,
@@ -395,102 +477,178 @@ class CCWindow:
     # Safely closing out the window
     def close_out(self, e = None):
         if not messagebox.askyesno("Confirm exit", "Do you want to exit CodeM UP?"): return
-        self.error_logger.manage_file_size() # Keeps error log capped at 50
+        self.error_logger.manage_file_size() # Writes any errors still waiting and rotates the error log if it has grown too large
         if self.pcc_handler != None: self.pcc_handler.webdriver.close_out()
         self.main_window.quit()
 
     # ------------------ Excel and PDF management ------------------
-    # Imports PDF and scans for ICD-10 codes
+    # Imports one or more PDFs chosen by the user and scans them for ICD-10 codes
     def import_pdf(self, e = None):
-        # Ensures that Excel file is closed (cannot write data to the file if it's open)
-        if self.pdf_processor.is_excel_file_open(self.excel_file_path):
+        if not self.confirm_import(): return
+
+        # Getting file path(s) from user. Several files can be selected (e.g., H&P, discharge summary and med list for one admission).
+        # Text exports, Word documents and C-CDA/CCD XML files are read directly (see document_adapters.py).
+        from document_adapters import supported_extensions
+        pdf_paths = filedialog.askopenfilenames(
+            title = "Select PDF(s) or other documents",
+            initialdir = self.pdf_default_dir,
+            filetypes = [
+                ("Supported documents", " ".join("*" + extension for extension in supported_extensions)),
+                ("PDFs", "*.pdf"),
+                ("C-CDA/CCD XML", "*.xml"),
+                ("Word documents", "*.docx"),
+                ("Text files", "*.txt")
+            ]
+        )
+
+        if len(pdf_paths) == 0: return # No file selected by user
+        self.import_pdfs(list(pdf_paths))
+
+    # Imports every PDF (and other supported document) in a folder chosen by the user and scans them for ICD-10 codes
+    def import_pdf_folder(self, e = None):
+        if not self.confirm_import(): return
+
+        pdf_folder = filedialog.askdirectory(title = "Select folder of PDFs", initialdir = self.pdf_default_dir)
+        if pdf_folder == "": return # No folder selected by user
+
+        from document_adapters import supported_extensions
+        pdf_paths = sorted(
+            os.path.join(pdf_folder, file_name) for file_name in os.listdir(pdf_folder) if file_name.lower().endswith(supported_extensions)
+        )
+        if pdf_paths == []:
+            messagebox.showerror("No PDFs found", "No PDF files (or other supported documents) were found in this folder.")
+            return
+        self.import_pdfs(pdf_paths)
+
+    # Checks that the Excel file is closed and that the user wants to clear existing codes. Returns True to proceed.
+    def confirm_import(self):
+        # Ensures that Excel file is closed (cannot write data to the file if it's open). Codes in the SQLite store can be imported either way.
+        if self.dataframe_handler.store == None and self.pdf_processor.is_excel_file_open(self.excel_file_path):
             messagebox.showerror(
                 "Excel file open",
                 "Please close the Excel codes file before importing a new set of codes."
             )
-            return
+            return False
 
         # Ensuring that user wants to proceed and clear out existing codes
-        if not messagebox.askyesno(
-                title = "Clear codes",
-                message = "Importing a new PDF will clear any codes previously imported.\n\n"
-                    "Do you want to proceed?"
-        ): return
-
-        # Getting file path from user
-        self.pdf_file_dir = filedialog.askopenfilename(
-            title = "Select PDF",
-            initialdir = self.pdf_default_dir,
-            filetypes = [("PDFs", "*.pdf")]
+        return messagebox.askyesno(
+            title = "Clear codes",
+            message = "Importing a new PDF will clear any codes previously imported.\n\n"
+                "Do you want to proceed?"
         )
 
-        if self.pdf_file_dir == "": return # No file selected by user
+    # Imports all PDFs at once and writes the merged codes, with the file and page each was found in, to the Excel file
+    def import_pdfs(self, pdf_paths: list):
+        self.pdf_file_dir = pdf_paths[0]
 
         # Disables buttons (large PDFs may require several seconds to process)
         self.import_pdf_button.config(text = "IMPORTING")
         self.disable_buttons()
         self.main_window.update() # Shows buttons as disabled
+        cache_hits_before = self.pdf_processor.cache_hits
+
+        # Extracts and scans the PDFs one page at a time. Each page's text is dropped as soon as it has been scanned.
+        for pdf_path, page_scan in self.pdf_processor.stream_batch(pdf_paths): self.show_import_progress(pdf_path, page_scan)
+        self.main_window.title("")
+        self.import_pdf_button.config(text = "PDF I\u0332mport")
+
+        # Parallel extraction failed partway, and the rest was extracted serially. Nothing for the user to do, but logged.
+        if self.pdf_processor.parallel_error != None:
+            self.error_logger.log_error(
+                "Parallel PDF text extraction failed. Remaining pages were extracted serially.",
+                self.pdf_processor.parallel_error
+            )
 
-        # Imports all PDF pages' text
-        # Receives a three-item tuple return
-        # tup[0] = either a list of all pages' text OR False if an error occured
-        # tup[1] = either None (successful text extraction) OR a string message to user about error
-        # tup[2] = either None (successful text extractiOn) OR exception captured by try/except
-        self.pdf_text_extracted = self.pdf_processor.import_pdf(self.pdf_file_dir)
-
-        if self.pdf_text_extracted[0] == False: # Error encountered in self.PdfProcessing
-            # Logs error
-            if self.pdf_text_extracted[2] != False: # False indicates an error to the user only (no codes found, etc.)
-                self.error_logger.log_error(
-                    "Attempted to extract text from PDF",
-                    self.pdf_text_extracted[2]
-                )
-
-            # Captures error message before resetting self.pdf_text_extracted
-            # (Reset to ensure no old data is retained that could cause errors with later processes)
-            err_msg = self.pdf_text_extracted[1]
-            self.reset_pdf_text_extracted()
-
-            # Informs user of error
-            messagebox.showerror("Error", err_msg)
+        # Files that could not be imported (error encountered in self.PdfProcessing)
+        # Logs errors (ErrorLogger ignores None, which indicates an error to the user only (no text found, etc.))
+        import_errors = ""
+        for pdf_path, import_pdf_e in self.pdf_processor.batch_errors:
+            self.error_logger.log_error(f"Attempted to extract text from PDF {pdf_path}", import_pdf_e.exception)
+            import_errors += f"\n\n{os.path.basename(pdf_path)}:\n{import_pdf_e.user_msg}"
+
+        # No file could be imported. Informs user of error.
+        if len(self.pdf_processor.batch_errors) == len(pdf_paths):
+            messagebox.showerror("Error", import_errors.strip())
             self.enable_buttons()
             return
 
-        # Gets all codes from extracted text
-        # self.pdf_text_extracted[0] is itself a list of text from each page
-        self.extracted_codes = self.pdf_processor.apply_regex(self.pdf_text_extracted[0])
+        self.extracted_codes = sorted(self.pdf_processor.regex_results)
 
         # Creates dataframe from extracted codes
-        self.dataframe_handler.create_df(self.extracted_codes)
-        response = self.dataframe_handler.save_codes_to_excel()
+        self.dataframe_handler.create_df(self.extracted_codes, self.pdf_processor.code_sources)
+        response = self.dataframe_handler.save_codes()
         if response != None: # None = no errors. If errors, user-friendly text description of error is returned.
             messagebox.showerror("Error encountered", response)
             self.enable_buttons()
             return
 
-        # Notifies user of how many codes were found
-        self.import_pdf_button.config(text="PDF I\u0332mport")
+        # Notifies user of how many codes were found (in the files that were imported)
         num_codes = len(self.extracted_codes)
         if num_codes == 1: code_sp = "code"
         else: code_sp = "codes"
-        messagebox.showinfo("Codes found", f"{len(self.extracted_codes)} {code_sp} were found.")
+        num_scanned = len(pdf_paths) - len(self.pdf_processor.batch_errors)
+        if num_scanned == 1: file_sp = "1 PDF"
+        else: file_sp = f"{num_scanned} PDFs"
+        codes_found_msg = f"{num_codes} {code_sp} were found in {file_sp}."
+        cache_hits = self.pdf_processor.cache_hits - cache_hits_before
+        if cache_hits > 0: codes_found_msg += f"\n\n({cache_hits} of {num_scanned} loaded from earlier imports.)"
+        skipped_bytes = self.pdf_processor.skipped_bytes
+        if skipped_bytes >= 1024 * 1024: codes_found_msg += f"\n\n({skipped_bytes / (1024 * 1024):.1f} MB of repeated text skipped.)"
+        elif skipped_bytes > 0: codes_found_msg += f"\n\n({-(-skipped_bytes // 1024)} KB of repeated text skipped.)"
+        if import_errors == "": messagebox.showinfo("Codes found", codes_found_msg)
+        else:
+            messagebox.showwarning(
+                "Codes found",
+                f"{codes_found_msg}\n\nThese files could not be imported:{import_errors}"
+            )
 
         # Turns buttons back on after PDF data extraction completes
         self.enable_buttons()
 
-    # Sets all 3 elements of self.pdf_text_extracted to None.
-    # Easy way to make sure variable is empty and results from a previous PDF doesn't interfere with a new process.
-    def reset_pdf_text_extracted(self): self.pdf_text_extracted = [None, None, None]
+    # Shows import progress in the window title as each page is scanned (large PDFs may take a while)
+    def show_import_progress(self, pdf_path: str, page_scan):
+        num_codes = len(self.pdf_processor.code_sources)
+        page_progress = f"page {page_scan.page_num}"
+        if page_scan.num_pages != None: page_progress += f" of {page_scan.num_pages}" # Not known for documents other than PDFs
+        self.main_window.title(f"Importing {os.path.basename(pdf_path)} {page_progress} -- {num_codes} codes found")
+        self.main_window.update()
 
     # Opens Excel file
     # Method not lambda function so that keyboard shortcut will work
+    # Codes in the SQLite store are exported to the Excel file first (unless it is already open in Excel)
     def open_excel_file(self, e = None):
+        if self.dataframe_handler.store != None and not self.pdf_processor.is_excel_file_open(self.excel_file_path):
+            if not self.import_excel_edits(): return
+            response = self.dataframe_handler.export_store_to_excel()
+            if response != None:
+                messagebox.showerror("Error encountered", response)
+                return
         os.system(f"start EXCEL.EXE {self.excel_file_path}")
 
+    # If codes are kept in the SQLite store and the Excel file has been edited since they were exported to it, asks whether to import the edits
+    # Returns False if the edits could not be imported (error already shown to the user), otherwise True
+    def import_excel_edits(self):
+        if not self.dataframe_handler.excel_has_edits(): return True
+        if not messagebox.askyesno(
+                "Import Excel edits?",
+                "The Excel codes file has been changed since codes were last exported to it.\n\n"
+                    "Do you want to import the changes from Excel? (No keeps the codes as they were before the changes.)\n\n"
+                    "Save the Excel file before importing the changes."
+        ):
+            self.dataframe_handler.store.set_info("excel_file_key", self.dataframe_handler.excel_file_key(log_missing = False)) # Not asked again
+            return True
+
+        response = self.dataframe_handler.import_excel_to_store()
+        if response != None:
+            messagebox.showerror("Error encountered", response)
+            return False
+        return True
+
     # ------------------ User Feedback ------------------
     # Copies all fails to clipboard if user requests it (at end of upload or anytime afterward
     def copy_fails_to_clipb(self, e = None):
         if self.import_fails_copy == "": return
+        import pyperclip # Deferred (see deferred_modules)
         pyperclip.copy(self.import_fails_copy)
         messagebox.showinfo(
             "Code fails copied",
@@ -517,7 +675,8 @@ class CCWindow:
 
     # Counts how many codes are in the Excel file. Excel file can be open for openpyxl to read this.
     def code_count(self, e = None):
-        self.dataframe_handler.read_codes_from_excel()
+        if not self.import_excel_edits(): return
+        self.dataframe_handler.read_codes()
         count = len(
             self.dataframe_handler.df_excel_import_codes[
                 self.dataframe_handler.df_excel_import_codes[
@@ -537,6 +696,7 @@ class CCWindow:
     # Instantiates PccHandler class (which instantiates Webdriver class from WebdriverFramework.py)
     def open_chrome(self, e = None):
         self.disable_buttons()
+        from pcc_handler import PccHandler # Deferred (see deferred_modules)
         self.pcc_handler = PccHandler(
             self.pcc_url,
             self.admis_date_id,
@@ -550,7 +710,9 @@ class CCWindow:
             self.log_file_name,
             self.FID,
             self.cwindow_x,
-            self.cwindow_y
+            self.cwindow_y,
+            self.code_set_version,
+            self.event_log_file
         )
         self.pcc_handler.open_new_window()
         self.enable_buttons()
@@ -568,8 +730,11 @@ class CCWindow:
             self.enable_buttons()
             return
 
-        # Reads back in the data as a dataframe from the Excel file
-        response = self.dataframe_handler.read_codes_from_excel()
+        # Reads back in the data as a dataframe from the Excel file (or the SQLite store)
+        if not self.import_excel_edits():
+            self.enable_buttons()
+            return
+        response = self.dataframe_handler.read_codes()
         if response != None: # None = successful, returned string = error message to user
             messagebox.showerror("Error encountered", response)
             self.enable_buttons()
@@ -0,0 +1,113 @@
+import sys
+
+if __name__ == "__main__":
+    print("This is not the main module. Do not execute directly.")
+    sys.exit()
+
+import datetime
+import pandas as pd
+from code_rows import CodeRow, code_rows_from_df, default_rank, default_classification
+
+# Options of PCC's Rank and Classification drop-downs (also the drop-down lists in the Excel template)
+rank_options = (
+    "Primary (Reason for facility Admission)", "Secondary", "Diagnosis 2", "3", "Diagnosis 3", "4", "5", "Diagnosis 4", "Diagnosis 5",
+    "6", "Diagnosis 6", "7", "Diagnosis 7", "8", "Diagnosis 8", "9", "Diagnosis 9", "Diagnosis 10", "Other", "Other Diagnosis"
+)
+classification_options = ("Admission", "Discharge", "During Stay", "History", "Re-admit", "Admitting Dx (#69)", "Present on Admission")
+
+# Date formats accepted for Resolved Date, in the order DataValidation.validate_user_input_date() tries them
+# (text appended before parsing, strptime format, True if the year has 2 digits)
+# Dates without a year are in the current year. 2-digit years more than 10 years in the future are in the last century.
+date_formats = (
+    ("/{year}", "%m/%d/%Y", False), (" {year}", "%B %d %Y", False), (" {year}", "%b %d %Y", False),
+    ("", "%m/%d/%Y", False), ("", "%m/%d/%y", True), ("", "%b %d %Y", False), ("", "%b %d %y", True),
+    ("", "%B %d %Y", False), ("", "%B %d %y", True), ("", "%Y/%m/%d", False)
+)
+
+# What will be entered into PCC, worked out from the whole codes table before Chrome is touched
+# code_rows: CodeRows to enter, in table order. Codes are valid and dotted, dates are MM/DD/YYYY and Rank/Classification are PCC options.
+# rejected_codes: codes that will not be entered at all. notes: report lines for the user ("E11.9 -- ..."), rejected codes first.
+class UploadPlan:
+    def __init__(self, code_rows: list, rejected_codes: list, notes: list):
+        self.code_rows = code_rows
+        self.rejected_codes = rejected_codes
+        self.notes = notes
+
+# Builds the UploadPlan for the codes table (DataframeHandler.df_excel_import_codes, columns A:F read by position)
+# Each check runs over a whole column at once. Rows are rejected for codes that are not in code_index (told apart as retired or unknown
+# with code_descriptions) and for codes listed more than once (only the first is entered). Details that can't be entered (unreadable dates,
+# Rank/Classification values that are not PCC options, etc.) are dropped or replaced with their defaults and noted.
+def build_upload_plan(df_codes, code_index, code_descriptions):
+    table = df_codes.iloc[:, :len(CodeRow.fields)].copy()
+    table.columns = CodeRow.fields[:len(table.columns)]
+    for field in CodeRow.fields[len(table.columns):]: table[field] = ""
+    table = table.fillna("").astype(str).apply(lambda column: column.str.strip())
+    table = table[table["code"] != ""]
+    rejected_codes, notes = [], []
+
+    # Codes: valid in the code set, in dotted form
+    keys = table["code"].str.replace(".", "", regex = False).str.upper()
+    valid_codes = code_index.codes # Normalized codes (set, CodeTable or CodeSetVersion)
+    valid = pd.Series([key in valid_codes for key in keys], index = table.index, dtype = bool)
+    for code in table.loc[~valid, "code"]:
+        rejected_codes.append(code)
+        if code_descriptions.check_code(code, code_index) == "retired": notes.append(f"{code} -- Not entered: code has been retired (no longer valid)")
+        else: notes.append(f"{code} -- Not entered: not a valid ICD-10 code")
+    table, keys = table[valid].copy(), keys[valid]
+    table["code"] = keys.where(keys.str.len() == 3, keys.str[:3] + "." + keys.str[3:])
+
+    # Duplicates: only the first row of a code is entered (PCC rejects a code the patient already has)
+    duplicated = table["code"].duplicated()
+    for code in table.loc[duplicated, "code"]: notes.append(f"{code} -- Not entered again: listed more than once")
+    table = table[~duplicated].copy()
+
+    # Resolved dates
+    dates = parse_dates(table["resolved_date"])
+    bad_dates = (table["resolved_date"] != "") & dates.isna()
+    for code, date in table.loc[bad_dates, ["code", "resolved_date"]].itertuples(index = False):
+        notes.append(f"{code} -- Failed to enter {date} in Resolved Date field (not a date)")
+    table["resolved_date"] = dates.dt.strftime("%m/%d/%Y").fillna("")
+
+    # Rank and Classification: blank or not an option = the default
+    for field, options, default, field_name in (
+            ("rank", rank_options, default_rank, "Rank drop-down menu"),
+            ("classification", classification_options, default_classification, "Classification drop-down")
+    ):
+        values = table[field].map(dict((value, match_option(value, options)) for value in table[field].unique()))
+        for code, value in table.loc[(table[field] != "") & values.isna(), ["code", field]].itertuples(index = False):
+            notes.append(f"{code} -- Failed to enter {value} in {field_name} (not an option, {default} entered instead)")
+        table[field] = values.fillna(default)
+
+    # Confidential: anything starting with "y" checks the box, blank or "n..." leaves it unchecked
+    confidential = table["confidential"].str.lower()
+    is_yes = confidential.str.startswith("y")
+    bad_confidential = (confidential != "") & ~is_yes & ~confidential.str.startswith("n")
+    for code, value in table.loc[bad_confidential, ["code", "confidential"]].itertuples(index = False):
+        notes.append(f"{code} -- Failed to enter {value} in 'Confidential' checkbox (not yes or no)")
+    table["confidential"] = is_yes.map({True: "Yes", False: ""})
+
+    return UploadPlan(code_rows_from_df(table), rejected_codes, notes)
+
+# Parses a column of dates the way DataValidation.validate_user_input_date() parses one. Returns datetimes (NaT where a value isn't a date).
+# A time after the date (e.g., "2024-01-02 00:00:00" for a date cell) is ignored.
+def parse_dates(dates):
+    now = datetime.datetime.now()
+    text = dates.str.lower().str.replace(r"\s+\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?$", "", regex = True)
+    text = text.str.replace(",", "", regex = False).str.replace("-", "/", regex = False).str.replace(".", "/", regex = False)
+
+    parsed = pd.Series(pd.NaT, index = dates.index, dtype = "datetime64[ns]")
+    for suffix, date_format, two_digit_year in date_formats:
+        missing = parsed.isna() & (text != "")
+        if not missing.any(): break
+        attempt = pd.to_datetime(text[missing] + suffix.format(year = now.year), format = date_format, errors = "coerce")
+        if two_digit_year: attempt = attempt.where(attempt.dt.year - now.year <= 10, attempt - pd.DateOffset(years = 100))
+        parsed[missing] = attempt
+    return parsed
+
+# Returns the option a value is (not case-sensitive), or None
+# Only exact matches count, like DataValidation: a typo or a cut-off value must be noted, not entered as whichever option it resembles.
+def match_option(value: str, options: tuple):
+    value = value.lower()
+    for option in options:
+        if option.lower() == value: return option
+    return None